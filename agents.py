@@ -1,6 +1,16 @@
 # agents.py
 
 import random
+from collections.abc import Sequence
+import numpy as np
+
+# Integer codes for roles and the behavior modifier of each (CEOs act like Staff)
+ROLES = ('CEO', 'Manager', 'Specialist', 'Staff')
+ROLE_BEHAVIOR_MODIFIERS = (0.8, 1.2, 1.0, 0.8)
+# Integer codes for AI attitudes, ordered so that becoming more positive is +1
+AI_ATTITUDES = ('negative', 'neutral', 'positive')
+# Share of the AI's contribution an agent takes up, indexed by attitude code
+AI_ATTITUDE_WEIGHTS = (0.2, 0.5, 1.0)
 
 class GenerativeAI:
     """
@@ -14,18 +24,22 @@ class GenerativeAI:
 
     def step(self, model):
         """
-        Evolution logic: Increase or decrease contribution based on usage.
+        Evolution logic: Increase or decrease contribution based on usage, by
+        the model's ai_evolution rule (see kernels.py).
+        Returns 'evolved' or 'diminished' when the rule raised or lowered the
+        contribution, None when it left it unchanged.
         """
-        if self.usage_count > model.ai_evolution_threshold:
-            self.knowledge_contribution += model.ai_evolution_increment
-            self.usage_count = 0  # Reset after evolution
-            print(f"AI evolved! New knowledge contribution: {self.knowledge_contribution}")
-        elif self.usage_count < model.ai_evolution_decrement_threshold:
-            self.knowledge_contribution = max(0.5, self.knowledge_contribution - model.ai_evolution_increment)
-            self.usage_count = 0  # Reset after diminution
-            print(f"AI diminished! New knowledge contribution: {self.knowledge_contribution}")
+        previous = self.knowledge_contribution
+        self.knowledge_contribution = float(model.rules.ai_evolution.function(
+            self.usage_count, previous, model.ai_evolution_threshold,
+            model.ai_evolution_decrement_threshold, model.ai_evolution_increment))
         # Reset usage count for the next step
         self.usage_count = 0
+        if self.knowledge_contribution > previous:
+            return 'evolved'
+        if self.knowledge_contribution < previous:
+            return 'diminished'
+        return None
 
     def provide_information(self):
         """
@@ -96,3 +110,174 @@ class EmployeeAgent:
                 self.ai_attitude = 'negative'
             elif self.ai_attitude == 'positive':
                 self.ai_attitude = 'neutral'
+
+
+class AgentPopulation:
+    """
+    Stores all employees of an organization as typed arrays indexed by agent id
+    (struct of arrays) instead of one EmployeeAgent object per employee.
+    Roles and AI attitudes are integer codes into ROLES and AI_ATTITUDES.
+    Indexing or iterating yields EmployeeView objects that keep the
+    EmployeeAgent API working on top of the arrays. Changes made through views
+    are reported to tracker (a metrics.MetricsTracker) when one is attached,
+    and views apply the kernels of rules (a kernels.Rules) when it is set.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.knowledge = np.zeros(size, dtype=np.float64)
+        self.expertise = np.zeros(size, dtype=np.float64)
+        self.role = np.zeros(size, dtype=np.int8)
+        self.ai_attitude = np.zeros(size, dtype=np.int8)
+        self.tracker = None
+        self.rules = None
+
+    def assign(self, role, expertise, ai_attitude):
+        """
+        Initializes all employees at once from arrays of role codes, expertise
+        levels and AI attitude codes; knowledge starts at the expertise level.
+        """
+        self.role[:] = role
+        self.expertise[:] = expertise
+        self.knowledge[:] = expertise
+        self.ai_attitude[:] = ai_attitude
+
+    def set_agent(self, agent_id, role, expertise, ai_attitude):
+        """
+        Initializes one employee; knowledge starts at the expertise level.
+        """
+        self.role[agent_id] = ROLES.index(role)
+        self.expertise[agent_id] = expertise
+        self.knowledge[agent_id] = expertise
+        self.ai_attitude[agent_id] = AI_ATTITUDES.index(ai_attitude)
+
+    @property
+    def behavior_modifier(self):
+        """
+        Role-based behavior modifier of every employee.
+        """
+        return np.asarray(ROLE_BEHAVIOR_MODIFIERS)[self.role]
+
+    def average_knowledge(self):
+        """
+        Mean knowledge over all employees.
+        """
+        return float(self.knowledge.mean())
+
+    def attitude_counts(self):
+        """
+        Number of employees per AI attitude code.
+        """
+        return np.bincount(self.ai_attitude, minlength=len(AI_ATTITUDES))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, agent_id):
+        if not 0 <= agent_id < self.size:
+            raise IndexError("Agent id out of range.")
+        return EmployeeView(self, agent_id)
+
+    def __iter__(self):
+        for agent_id in range(self.size):
+            yield EmployeeView(self, agent_id)
+
+
+class EmployeeView(EmployeeAgent):
+    """
+    A lightweight EmployeeAgent whose state lives in one row of an
+    AgentPopulation. Views are created on demand and hold no state themselves.
+    """
+    def __init__(self, population, unique_id):
+        self.population = population
+        self.unique_id = unique_id
+
+    @property
+    def role(self):
+        return ROLES[self.population.role[self.unique_id]]
+
+    @property
+    def expertise(self):
+        return float(self.population.expertise[self.unique_id])
+
+    @property
+    def knowledge(self):
+        return float(self.population.knowledge[self.unique_id])
+
+    @knowledge.setter
+    def knowledge(self, value):
+        population = self.population
+        if population.tracker is not None:
+            population.tracker.knowledge_changed(population.knowledge[self.unique_id], value)
+        population.knowledge[self.unique_id] = value
+
+    @property
+    def ai_attitude(self):
+        return AI_ATTITUDES[self.population.ai_attitude[self.unique_id]]
+
+    @ai_attitude.setter
+    def ai_attitude(self, value):
+        population = self.population
+        code = AI_ATTITUDES.index(value)
+        if population.tracker is not None:
+            population.tracker.attitude_changed(population.ai_attitude[self.unique_id], code)
+        population.ai_attitude[self.unique_id] = code
+
+    @property
+    def behavior_modifier(self):
+        return ROLE_BEHAVIOR_MODIFIERS[self.population.role[self.unique_id]]
+
+    def interact_with_agent(self, partner):
+        rules = self.population.rules
+        if rules is None:
+            return super().interact_with_agent(partner)
+        if isinstance(partner, EmployeeAgent):
+            interaction = rules.interaction.function
+            knowledge, partner_knowledge = self.knowledge, partner.knowledge
+            self.knowledge = interaction(knowledge, partner_knowledge, self.behavior_modifier)
+            partner.knowledge = interaction(partner_knowledge, knowledge, partner.behavior_modifier)
+
+    def interact_with_ai(self, ai_agent):
+        rules = self.population.rules
+        if rules is None:
+            return super().interact_with_ai(ai_agent)
+        attitude = self.population.ai_attitude[self.unique_id]
+        self.knowledge += rules.ai_uplift.function(attitude, ai_agent.provide_information())
+
+    def update_ai_attitude(self, model):
+        rules = self.population.rules
+        if rules is None:
+            return super().update_ai_attitude(model)
+        attitude = int(self.population.ai_attitude[self.unique_id])
+        new_attitude = rules.attitude.function(attitude, self.knowledge - self.expertise,
+                                               model.attitude_positive_threshold,
+                                               model.attitude_negative_threshold)
+        if new_attitude != attitude:
+            self.ai_attitude = AI_ATTITUDES[new_attitude]
+
+
+class AgentSequence(Sequence):
+    """
+    Read-only sequence of all agents of an organization: EmployeeView objects
+    for the ids of population, followed by ai_agent. Views are created only
+    for the items actually accessed, so building the sequence is O(1) while
+    iterating it still creates one view per employee.
+    """
+    def __init__(self, population, ai_agent):
+        self.population = population
+        self.ai_agent = ai_agent
+
+    def __len__(self):
+        return len(self.population) + 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index == len(self.population):
+            return self.ai_agent
+        return self.population[index]
+
+    def __iter__(self):
+        yield from self.population
+        yield self.ai_agent
@@ -0,0 +1,157 @@
+# analysis.py
+
+import hashlib
+import os
+from statistics import NormalDist
+import numpy as np
+from sinks import read_results
+
+METRIC_COLUMNS = ("Average Knowledge", "Positive Attitudes", "Neutral Attitudes", "Negative Attitudes",
+                  "AI Knowledge Contribution", "Network Centrality")
+
+class RunAggregator:
+    """
+    Streams the results of many runs into per-step sums, so memory depends on
+    the number of steps and columns, not on the number of runs.
+
+    For every step and column it keeps the number of runs, the sum and the
+    sum of squares of the values; for every pair of columns it keeps the sum
+    and sum of squares of the runs' Fisher-transformed correlations
+    (arctanh r), from which summary() derives means, confidence bands and
+    cross-run correlation summaries.
+    """
+    def __init__(self, columns=METRIC_COLUMNS):
+        self.columns = tuple(columns)
+        num_columns = len(self.columns)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.total = np.zeros((0, num_columns))
+        self.total_sq = np.zeros((0, num_columns))
+        self.num_runs = 0
+        self.corr_count = np.zeros((num_columns, num_columns), dtype=np.int64)
+        self.corr_total = np.zeros((num_columns, num_columns))
+        self.corr_total_sq = np.zeros((num_columns, num_columns))
+
+    def _grow(self, num_steps):
+        if num_steps > len(self.count):
+            extra = num_steps - len(self.count)
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.total = np.vstack([self.total, np.zeros((extra, len(self.columns)))])
+            self.total_sq = np.vstack([self.total_sq, np.zeros((extra, len(self.columns)))])
+
+    def add_run(self, steps, values):
+        """
+        Adds one run: steps (1-based step numbers) and values of shape
+        (len(steps), len(columns)).
+        """
+        steps = np.asarray(steps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(steps):
+            return
+        self._grow(int(steps.max()) + 1)
+        np.add.at(self.count, steps, 1)
+        np.add.at(self.total, steps, values)
+        np.add.at(self.total_sq, steps, values ** 2)
+        self.num_runs += 1
+
+        if len(steps) > 2:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlation = np.corrcoef(values, rowvar=False)
+                z = np.arctanh(np.clip(correlation, -0.999999, 0.999999))
+            defined = np.isfinite(z)
+            self.corr_count += defined
+            self.corr_total += np.where(defined, z, 0.0)
+            self.corr_total_sq += np.where(defined, z ** 2, 0.0)
+
+    def add_file(self, path, run_key=None):
+        """
+        Adds the runs in a result file (any format written by run_model). With
+        run_key, rows are split into runs by that column (e.g. 'seed' for
+        sweep tables); otherwise the file is one run.
+        """
+        data = read_results(path)
+        if run_key is None:
+            self.add_run(data["Step"].to_numpy(), data[list(self.columns)].to_numpy())
+            return
+        for _, run in data.groupby(run_key, sort=False):
+            self.add_run(run["Step"].to_numpy(), run[list(self.columns)].to_numpy())
+
+    def summary(self, confidence=0.95):
+        """
+        Returns a dict with 'steps', per-step 'mean', 'sd', 'count',
+        'ci_low' and 'ci_high' arrays of shape (steps, columns), and the
+        cross-run correlation summary 'corr_mean', 'corr_low', 'corr_high'
+        (columns x columns, back-transformed from the Fisher z means) and
+        'corr_count'.
+        """
+        z_critical = NormalDist().inv_cdf(0.5 + confidence / 2)
+        observed = np.flatnonzero(self.count)
+        count = self.count[observed][:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.total[observed] / count
+            variance = (self.total_sq[observed] - count * mean ** 2) / (count - 1)
+            sd = np.sqrt(np.maximum(variance, 0.0))
+            half_width = np.where(count > 1, z_critical * sd / np.sqrt(count), 0.0)
+
+            corr_mean_z = self.corr_total / self.corr_count
+            corr_variance = (self.corr_total_sq - self.corr_count * corr_mean_z ** 2) / (self.corr_count - 1)
+            corr_half_width = np.where(self.corr_count > 1,
+                                       z_critical * np.sqrt(np.maximum(corr_variance, 0.0) / self.corr_count),
+                                       0.0)
+        return {
+            "columns": self.columns,
+            "steps": observed,
+            "count": self.count[observed],
+            "mean": mean,
+            "sd": np.where(count > 1, sd, np.nan),
+            "ci_low": mean - half_width,
+            "ci_high": mean + half_width,
+            "num_runs": self.num_runs,
+            "corr_mean": np.tanh(corr_mean_z),
+            "corr_low": np.tanh(corr_mean_z - corr_half_width),
+            "corr_high": np.tanh(corr_mean_z + corr_half_width),
+            "corr_count": self.corr_count,
+        }
+
+    def state(self):
+        """
+        The running sums as arrays, for caching.
+        """
+        return {name: getattr(self, name) for name in
+                ("count", "total", "total_sq", "corr_count", "corr_total", "corr_total_sq")}
+
+def files_fingerprint(paths, columns, run_key):
+    """
+    Hash of the files' paths, sizes and modification times and of the
+    aggregation settings; changes whenever a cached aggregate would be stale.
+    """
+    digest = hashlib.sha1(repr((tuple(columns), run_key)).encode())
+    for path in sorted(os.path.abspath(path) for path in paths):
+        status = os.stat(path)
+        digest.update(f"{path}\0{status.st_size}\0{status.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def aggregate_runs(paths, columns=METRIC_COLUMNS, run_key=None, cache_path=None):
+    """
+    Streams result files through a RunAggregator and returns it. With
+    cache_path the running sums are saved there (.npz) and reused as long as
+    no file was added, removed or modified.
+    """
+    fingerprint = files_fingerprint(paths, columns, run_key)
+    aggregator = RunAggregator(columns)
+    if cache_path is not None and os.path.exists(cache_path):
+        with np.load(cache_path) as cache:
+            if str(cache["fingerprint"]) == fingerprint:
+                for name in aggregator.state():
+                    setattr(aggregator, name, cache[name])
+                aggregator.num_runs = int(cache["num_runs"])
+                return aggregator
+
+    for path in paths:
+        aggregator.add_file(path, run_key)
+
+    if cache_path is not None:
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez(cache_path, fingerprint=fingerprint, num_runs=aggregator.num_runs, **aggregator.state())
+    return aggregator
@@ -0,0 +1,263 @@
+# batch.py
+
+import numpy as np
+from agents import AI_ATTITUDES
+from engine import UPDATE_MODES, interact, sample_partners
+from model import OrganizationModel
+from networks import replace_csr_rows, to_csr
+
+class BatchedOrganizationModel:
+    """
+    Many independent organizations, each with its own OrganizationModel
+    parameters, stepped together as one set of arrays.
+
+    All employees of all organizations are stacked into flat arrays
+    (organization o owns positions offsets[o]:offsets[o + 1], org_index maps
+    each position back to its organization) and both networks become one
+    block-diagonal CSR adjacency, so a step costs a fixed number of NumPy
+    operations for the whole batch instead of one Python loop per
+    organization. Per-organization parameters are broadcast through
+    org_index, and GenerativeAI evolution and data collection are vectorized
+    over organizations. All organizations must use the same rule kernels
+    (see kernels.py), which are applied to the whole batch at once.
+
+    Every organization is built by OrganizationModel (so with the same seed
+    it starts from the same state as a standalone model) and kept in
+    organizations for its networks; their population arrays become views
+    into the batch arrays. Social network changes still run per
+    organization, through its own edge pool and random stream.
+
+    Update modes:
+        'synchronous': As in engine.ArrayEngine, every phase is applied to
+            all employees at once.
+        'sequential': As in engine.ArrayEngine, employees act one after
+            another in id order within their organization; the n-th
+            employees of all organizations act together, so a step is one
+            vectorized update per employee position.
+    """
+    COLUMNS = ("Step", "Average Knowledge", "Positive Attitudes", "Neutral Attitudes",
+               "Negative Attitudes", "AI Knowledge Contribution", "Network Centrality")
+
+    def __init__(self, params, update_mode='synchronous', seed=None):
+        """
+        Parameters:
+            params: List with one dict of OrganizationModel.__init__ kwargs per
+                organization (engine, update_mode and quiet are ignored)
+            update_mode: 'synchronous' or 'sequential'
+            seed: Seed for the batch; organizations without their own seed get
+                one derived from it
+        """
+        if update_mode not in UPDATE_MODES:
+            raise ValueError("Unsupported update mode.")
+        self.update_mode = update_mode
+        seed_seqs = np.random.SeedSequence(seed).spawn(len(params) + 1)
+        self.rng = np.random.default_rng(seed_seqs[-1])
+        self.organizations = []
+        for org_params, seed_seq in zip(params, seed_seqs):
+            org_params = dict(org_params, engine='agent', quiet=True)
+            org_params.setdefault('seed', int(seed_seq.generate_state(1)[0]))
+            org_params.pop('update_mode', None)
+            self.organizations.append(OrganizationModel(**org_params))
+        self.num_organizations = len(self.organizations)
+        self.current_step = 0
+        self.rules = self.organizations[0].rules if self.organizations else None
+        if any(org.rules.names != self.rules.names for org in self.organizations):
+            raise ValueError("All organizations must use the same rules.")
+
+        # Stacked employees
+        organizations = self.organizations
+        self.sizes = np.array([org.num_employees for org in organizations], dtype=np.int64)
+        self.offsets = np.zeros(self.num_organizations + 1, dtype=np.int64)
+        np.cumsum(self.sizes, out=self.offsets[1:])
+        self.org_index = np.repeat(np.arange(self.num_organizations), self.sizes)
+        self.knowledge = np.concatenate([org.population.knowledge for org in organizations])
+        self.expertise = np.concatenate([org.population.expertise for org in organizations])
+        self.ai_attitude = np.concatenate([org.population.ai_attitude for org in organizations])
+        self.behavior_modifier = np.concatenate([org.population.behavior_modifier for org in organizations])
+        for o, org in enumerate(organizations):
+            population = org.population
+            population.knowledge = self.knowledge[self.offsets[o]:self.offsets[o + 1]]
+            population.expertise = self.expertise[self.offsets[o]:self.offsets[o + 1]]
+            population.ai_attitude = self.ai_attitude[self.offsets[o]:self.offsets[o + 1]]
+
+        # Parameters per organization, and per employee where the step needs them
+        def parameter(name):
+            return np.array([getattr(org, name) for org in organizations])
+        self.decay = parameter('knowledge_decay_rate')[self.org_index]
+        self.positive_threshold = parameter('attitude_positive_threshold')[self.org_index]
+        self.negative_threshold = parameter('attitude_negative_threshold')[self.org_index]
+        self.ai_contribution = np.array([org.ai_agent.knowledge_contribution for org in organizations],
+                                        dtype=np.float64)
+        self.ai_evolution_threshold = parameter('ai_evolution_threshold')
+        self.ai_evolution_decrement_threshold = parameter('ai_evolution_decrement_threshold')
+        self.ai_evolution_increment = parameter('ai_evolution_increment')
+        self.dynamic_network = parameter('dynamic_network').astype(bool)
+        self.network_change_frequency = parameter('network_change_frequency')
+
+        # Block-diagonal adjacency; partners outside an organization's employees are -1
+        self.social_csr = self._stack([self._block(o, to_csr(org.social_network, org.num_employees,
+                                                             org.social_edges.edges))
+                                       for o, org in enumerate(organizations)])
+        self.org_csr = self._stack([self._block(o, org.org_chart.csr(org.num_employees))
+                                    for o, org in enumerate(organizations)])
+        self.network_centrality = np.zeros(self.num_organizations)
+        self._update_centrality(range(self.num_organizations))
+
+        self.data = {column: [] for column in self.COLUMNS}
+
+    def _block(self, o, csr):
+        indptr, indices = csr
+        indices = np.where(indices < self.sizes[o], indices + self.offsets[o], -1)
+        return indptr, indices
+
+    def _row_indices(self, row_orgs, degrees, neighbors):
+        """
+        Entries of rebuilt social rows as in to_csr (ascending node ids within
+        every row) in batch positions, from each row's organization and degree
+        and all their neighbor ids concatenated.
+        """
+        entry_rows = np.repeat(np.arange(len(degrees)), degrees)
+        entry_orgs = np.asarray(row_orgs, dtype=np.int64)[entry_rows]
+        neighbors = np.asarray(neighbors, dtype=np.int64)
+        neighbors = neighbors[np.lexsort((neighbors, entry_rows))]
+        return np.where(neighbors < self.sizes[entry_orgs], neighbors + self.offsets[entry_orgs], -1)
+
+    def _stack(self, blocks):
+        degrees = np.concatenate([np.diff(indptr) for indptr, _ in blocks])
+        indptr = np.zeros(len(degrees) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        return indptr, np.concatenate([indices for _, indices in blocks])
+
+    def _update_centrality(self, orgs):
+        for o in orgs:
+            self.network_centrality[o] = self.organizations[o].metrics.network_centrality()
+
+    def step(self):
+        """
+        Advances every organization by one step.
+        """
+        self.current_step += 1
+        if self.update_mode == 'sequential':
+            self._step_sequential()
+        else:
+            self._step_synchronous()
+
+        # AI evolves based on usage (every employee used it once)
+        self.ai_contribution[:] = self.rules.ai_evolution(self.sizes, self.ai_contribution,
+                                                          self.ai_evolution_threshold,
+                                                          self.ai_evolution_decrement_threshold,
+                                                          self.ai_evolution_increment)
+
+        # Dynamic network changes, per organization; only the rows of the
+        # employees whose edges changed are rebuilt, in one pass over the batch
+        due = np.flatnonzero(self.dynamic_network & (self.current_step % self.network_change_frequency == 0))
+        rows, row_orgs, degrees, neighbors = [], [], [], []
+        for o in due:
+            organization = self.organizations[o]
+            organization.current_step = self.current_step
+            pool = organization.social_edges
+            pool.edge_log = []
+            organization.modify_social_network()
+            touched = {node for edge in pool.edge_log for node in edge if node < organization.num_employees}
+            pool.edge_log = None
+            # The graph's own adjacency dict, without networkx's view layers
+            adjacency = organization.social_network._adj
+            offset = int(self.offsets[o])
+            for node in sorted(touched):
+                row = adjacency[node]
+                rows.append(offset + node)
+                row_orgs.append(o)
+                degrees.append(len(row))
+                neighbors.extend(row)
+        if rows:
+            self.social_csr = replace_csr_rows(self.social_csr, rows, degrees,
+                                               self._row_indices(row_orgs, degrees, neighbors))
+        if due.size:
+            self._update_centrality(due)
+
+        self.collect_data()
+
+    def _step_synchronous(self):
+        knowledge = np.maximum(self.knowledge - self.decay, 0.0)
+        num_agents = len(self.knowledge)
+        knowledge = interact(knowledge, sample_partners(self.rng, *self.social_csr, num_agents),
+                             self.behavior_modifier, self.rules)
+        knowledge = interact(knowledge, sample_partners(self.rng, *self.org_csr, num_agents),
+                             self.behavior_modifier, self.rules)
+        knowledge += self.rules.ai_uplift(self.ai_attitude, self.ai_contribution[self.org_index])
+        self.ai_attitude[:] = self.rules.attitude(self.ai_attitude, knowledge - self.expertise,
+                                                  self.positive_threshold, self.negative_threshold)
+        self.knowledge[:] = knowledge
+
+    def _step_sequential(self):
+        social = sample_partners(self.rng, *self.social_csr, len(self.knowledge))
+        org = sample_partners(self.rng, *self.org_csr, len(self.knowledge))
+        knowledge = self.knowledge
+        attitude = self.ai_attitude
+        modifier = self.behavior_modifier
+        # Organizations largest first, and how many have more than i employees
+        by_size = np.argsort(-self.sizes, kind='stable')
+        positions = np.arange(self.sizes.max(initial=0))
+        num_with = len(self.sizes) - np.searchsorted(np.sort(self.sizes), positions, side='right')
+        rules = self.rules
+
+        for i in positions:
+            # The i-th employee of every organization with more than i employees
+            orgs = by_size[:num_with[i]]
+            agents = self.offsets[orgs] + i
+            knowledge[agents] = np.maximum(knowledge[agents] - self.decay[agents], 0.0)
+            for partners in (social, org):
+                partner = partners[agents]
+                acting = partner >= 0
+                actor, partner = agents[acting], partner[acting]
+                own, other = knowledge[actor], knowledge[partner]
+                knowledge[actor] = rules.interaction(own, other, modifier[actor])
+                knowledge[partner] = rules.interaction(other, own, modifier[partner])
+            current = attitude[agents]
+            knowledge[agents] += rules.ai_uplift(current, self.ai_contribution[orgs])
+            attitude[agents] = rules.attitude(current, knowledge[agents] - self.expertise[agents],
+                                              self.positive_threshold[agents],
+                                              self.negative_threshold[agents])
+
+    def collect_data(self):
+        """
+        Collects every organization's metrics at the current step, one array
+        (indexed by organization) per column.
+        """
+        average_knowledge = np.bincount(self.org_index, weights=self.knowledge,
+                                        minlength=self.num_organizations) / np.maximum(self.sizes, 1)
+        counts = np.bincount(self.org_index * len(AI_ATTITUDES) + self.ai_attitude,
+                             minlength=self.num_organizations * len(AI_ATTITUDES))
+        negative, neutral, positive = counts.reshape(-1, len(AI_ATTITUDES)).T
+        self.data["Step"].append(np.full(self.num_organizations, self.current_step))
+        self.data["Average Knowledge"].append(average_knowledge)
+        self.data["Positive Attitudes"].append(positive)
+        self.data["Neutral Attitudes"].append(neutral)
+        self.data["Negative Attitudes"].append(negative)
+        self.data["AI Knowledge Contribution"].append(self.ai_contribution.copy())
+        self.data["Network Centrality"].append(self.network_centrality.copy())
+
+    def run_model(self, n_steps=100):
+        """
+        Runs every organization for n_steps steps.
+        """
+        for _ in range(n_steps):
+            self.step()
+
+    def results(self):
+        """
+        Collected data as {column: array of shape (steps, organizations)}.
+        """
+        return {column: np.array(values) for column, values in self.data.items()}
+
+    def to_frame(self):
+        """
+        Collected data as a tidy pandas DataFrame with one row per organization
+        and step, keyed by the 'organization' column.
+        """
+        import pandas as pd
+
+        results = self.results()
+        frame = pd.DataFrame({column: values.T.ravel() for column, values in results.items()})
+        frame.insert(0, "organization", np.repeat(np.arange(self.num_organizations), len(self.data["Step"])))
+        return frame
@@ -0,0 +1,68 @@
+# benchmarks/bench_edge_changes.py
+
+import argparse
+import os
+import random
+import sys
+import time
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from networks import EdgePool, add_random_edges, remove_random_edges, create_small_world_network
+
+def legacy_add_random_edges(G, num_edges, rng):
+    """
+    The original implementation: lists and shuffles every missing edge.
+    """
+    possible_edges = list(nx.non_edges(G))
+    rng.shuffle(possible_edges)
+    for edge in possible_edges[:num_edges]:
+        G.add_edge(*edge)
+
+def legacy_remove_random_edges(G, num_edges, rng):
+    """
+    The original implementation: lists and shuffles every edge.
+    """
+    existing_edges = list(G.edges())
+    rng.shuffle(existing_edges)
+    for edge in existing_edges[:num_edges]:
+        G.remove_edge(*edge)
+
+def time_calls(function, repeats):
+    """
+    Mean wall time of repeats calls to function.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark random edge changes against the original implementation.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000, 100000])
+    parser.add_argument('--num-edges', type=int, default=5, help="Edges changed per call")
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--legacy-max', type=int, default=2000,
+                        help="Largest size to run the O(N^2) original on")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'nodes':>8} {'operation':>9} {'legacy (ms)':>12} {'no pool (ms)':>13} {'pool (ms)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        G = create_small_world_network(size, 4, 0.1, seed=0)
+        pool = EdgePool(G)
+        for operation, new, legacy in (('add', add_random_edges, legacy_add_random_edges),
+                                       ('remove', remove_random_edges, legacy_remove_random_edges)):
+            pooled = time_calls(lambda: new(G, args.num_edges, rng, pool=pool), args.repeats)
+            unpooled = time_calls(lambda: new(G, args.num_edges, rng), args.repeats)
+            pool = EdgePool(G)
+            if size <= args.legacy_max:
+                old = time_calls(lambda: legacy(G, args.num_edges, rng), max(1, args.repeats // 10))
+                pool = EdgePool(G)
+                print(f"{size:>8} {operation:>9} {old * 1e3:>12.3f} {unpooled * 1e3:>13.3f} "
+                      f"{pooled * 1e3:>10.4f} {old / pooled:>7.0f}x")
+            else:
+                print(f"{size:>8} {operation:>9} {'-':>12} {unpooled * 1e3:>13.3f} {pooled * 1e3:>10.4f} {'-':>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_model.py
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+METRICS = ('construct_s', 'warmup_s', 'step_s', 'agents_s', 'network_s', 'collect_s', 'peak_rss_mb')
+
+def time_repeated(function, repeats):
+    """
+    Mean wall time of repeats calls to function.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+def bench_config(config, steps, repeats):
+    """
+    Times one configuration; runs in a fresh worker process so peak memory
+    belongs to this configuration alone.
+    """
+    from model import OrganizationModel
+
+    start = time.perf_counter()
+    model = OrganizationModel(num_employees=config['num_employees'],
+                              social_network_type=config['social_network_type'],
+                              org_network_type=config['org_network_type'],
+                              engine=config['engine'],
+                              update_mode=config['update_mode'],
+                              fit_org_to_employees=True, seed=0, quiet=True)
+    result = dict(config, construct_s=time.perf_counter() - start)
+
+    # One step outside the timings, so one-off costs (JIT compilation, first
+    # allocations) are reported as warmup_s instead of inflating step_s
+    start = time.perf_counter()
+    model.step()
+    result['warmup_s'] = time.perf_counter() - start
+
+    # Full steps, then each phase on its own
+    result['step_s'] = time_repeated(model.step, steps)
+    agent_phase = model.engine.step if model.engine is not None else model.step_agents
+    result['agents_s'] = time_repeated(agent_phase, steps)
+    result['network_s'] = time_repeated(model.modify_social_network, repeats)
+    result['collect_s'] = time_repeated(model.collect_data, repeats)
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_suite(args):
+    configs = [dict(num_employees=size, social_network_type=social, org_network_type=org,
+                    engine=engine, update_mode=args.update_mode)
+               for size, social, org, engine in itertools.product(args.sizes, args.social, args.org,
+                                                                  args.engines)]
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for config in configs:
+        with context.Pool(1) as pool:
+            try:
+                result = pool.apply(bench_config, (config, args.steps, args.repeats))
+            except Exception as error:
+                result = dict(config, error=repr(error))
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "steps": args.steps,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Benchmark results saved to '{output}'.")
+
+def compare(base_path, new_path):
+    """
+    Prints new/base ratios of every metric for configurations in both reports.
+    """
+    with open(base_path) as base_file, open(new_path) as new_file:
+        base, new = json.load(base_file), json.load(new_file)
+
+    def key(result):
+        return (result['num_employees'], result['social_network_type'], result['org_network_type'],
+                result['engine'], result['update_mode'])
+
+    base_results = {key(result): result for result in base['results'] if 'error' not in result}
+    print(f"{base['commit']} -> {new['commit']} (ratio new/base, < 1 is better)")
+    print(f"{'employees':>10} {'social':>11} {'org':>12} {'engine':>6} " + ' '.join(f"{m:>11}" for m in METRICS))
+    for result in new['results']:
+        old = base_results.get(key(result))
+        if old is None or 'error' in result:
+            continue
+        ratios = ' '.join(f"{result[m] / old[m]:>11.2f}" if old.get(m) and m in result else f"{'-':>11}"
+                          for m in METRICS)
+        print(f"{result['num_employees']:>10} {result['social_network_type']:>11} "
+              f"{result['org_network_type']:>12} {result['engine']:>6} {ratios}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OrganizationModel construction, stepping, "
+                                                 "network mutation and metric collection.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument('--social', nargs='+', default=['small_world', 'scale_free'])
+    parser.add_argument('--org', nargs='+', default=['hierarchical', 'onion'])
+    parser.add_argument('--engines', nargs='+', default=['array'])
+    parser.add_argument('--update-mode', default='synchronous')
+    parser.add_argument('--steps', type=int, default=5, help="Steps timed per configuration")
+    parser.add_argument('--repeats', type=int, default=20, help="Calls timed for network changes and metrics")
+    parser.add_argument('--output', help="Result JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run_suite(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# checkpoint.py
+
+import io
+import json
+import os
+import random
+import numpy as np
+from agents import AgentPopulation, GenerativeAI
+from hierarchy import HierarchyIndex
+from networks import EdgePool, OrgChart, adjacency_arrays, graph_from_adjacency
+
+CHECKPOINT_VERSION = 1
+
+def _to_json(value):
+    """
+    NumPy scalars and arrays (e.g. parameters taken from a grid) as the
+    Python values json can write.
+    """
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def save_checkpoint(model, path):
+    """
+    Writes the full state of an OrganizationModel to an uncompressed NumPy
+    .npz archive: constructor arguments, step counter, GenerativeAI state,
+    agent arrays, both networks as arrays (social neighbors and the edge
+    pool in their exact order), both random generators' states, the metric
+    totals, the event scheduler's queue, the collected data and how far the
+    run's result file is written. Event listeners, result sinks and the
+    trajectory recorder are not saved.
+
+    path may be a file name (written atomically) or a writable binary file.
+    """
+    nodes, indptr, indices = adjacency_arrays(model.social_network)
+    metrics = model.metrics
+    # Engines with state of their own (the event scheduler's queue) provide it as arrays
+    engine_state = model.engine.get_state() if hasattr(model.engine, 'get_state') else {}
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "params": model.params,
+        "current_step": model.current_step,
+        "ai_knowledge_contribution": model.ai_agent.knowledge_contribution,
+        "ai_usage_count": model.ai_agent.usage_count,
+        "random_state": model.random.getstate(),
+        "rng_state": model.rng.bit_generator.state,
+        "knowledge_total": metrics.knowledge_total,
+        "attitude_counts": metrics.attitude_counts,
+        "data_columns": list(model.data),
+        "engine_state": list(engine_state),
+        "output": model.output,
+    }
+    population = model.population
+    chart = model.org_chart
+    arrays = {
+        "meta": np.frombuffer(json.dumps(meta, default=_to_json).encode(), dtype=np.uint8),
+        "knowledge": population.knowledge,
+        "expertise": population.expertise,
+        "role": population.role,
+        "ai_attitude": population.ai_attitude,
+        "org_parent": chart.parent,
+        "org_level_bounds": chart.level_bounds,
+        "org_lateral_sources": chart.lateral_sources,
+        "org_lateral_targets": chart.lateral_targets,
+        "social_nodes": nodes,
+        "social_indptr": indptr,
+        "social_indices": indices,
+        "pool_nodes": np.array(model.social_edges.nodes, dtype=np.int64),
+        "pool_edges": np.array(model.social_edges.edges, dtype=np.int64).reshape(-1, 2),
+    }
+    for name, values in engine_state.items():
+        arrays[f"engine_{name}"] = values
+    for i, values in enumerate(model.data.values()):
+        arrays[f"data_{i}"] = np.asarray(values)
+
+    if not isinstance(path, (str, os.PathLike)):
+        np.savez(path, **arrays)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as checkpoint_file:
+        np.savez(checkpoint_file, **arrays)
+    os.replace(temporary_path, path)
+
+def load_checkpoint(path):
+    """
+    Restores an OrganizationModel from a checkpoint written by save_checkpoint.
+    Continuing the restored model is bit-identical to continuing the original.
+    """
+    from model import OrganizationModel
+
+    with np.load(path) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    meta = json.loads(arrays["meta"].tobytes().decode())
+    if meta["version"] != CHECKPOINT_VERSION:
+        raise ValueError("Unsupported checkpoint version.")
+
+    model = OrganizationModel.__new__(OrganizationModel)
+    model.params = meta["params"]
+    model.configure(model.params)
+    model.current_step = meta["current_step"]
+    model.random = random.Random()
+    model.rng = np.random.default_rng()
+
+    model.org_chart = OrgChart(arrays["org_parent"], arrays["org_level_bounds"],
+                               arrays["org_lateral_sources"], arrays["org_lateral_targets"])
+    model.hierarchy = HierarchyIndex(model.org_chart.parent)
+    model.social_network = graph_from_adjacency(arrays["social_nodes"], arrays["social_indptr"],
+                                                arrays["social_indices"])
+
+    model.ai_agent = GenerativeAI(model.num_employees, meta["ai_knowledge_contribution"])
+    model.ai_agent.usage_count = meta["ai_usage_count"]
+
+    model.population = AgentPopulation(model.num_employees)
+    for name in ("knowledge", "expertise", "role", "ai_attitude"):
+        getattr(model.population, name)[:] = arrays[name]
+
+    pool = EdgePool(model.social_network, nodes=arrays["pool_nodes"].tolist(),
+                    edges=map(tuple, arrays["pool_edges"].tolist()))
+    model.setup(pool)
+    model.metrics.knowledge_total = meta["knowledge_total"]
+    model.metrics.attitude_counts = meta["attitude_counts"]
+    if meta.get("engine_state"):
+        model.engine.set_state({name: arrays[f"engine_{name}"] for name in meta["engine_state"]})
+
+    # Restored last, since setting up an engine may draw from the generators
+    version, internal_state, gauss_next = meta["random_state"]
+    model.random.setstate((version, tuple(internal_state), gauss_next))
+    model.rng.bit_generator.state = meta["rng_state"]
+
+    for i, name in enumerate(meta["data_columns"]):
+        model.data[name] = arrays[f"data_{i}"].tolist()
+    model.output = meta.get("output")
+    return model
+
+def resume(path, n_steps, **run_kwargs):
+    """
+    Loads a checkpoint and runs n_steps more steps (run_kwargs go to
+    run_model). Results are appended to the result file of the checkpointed
+    run, cut back to the rows written when the checkpoint was saved, unless
+    run_kwargs name a different output_path. Returns the model.
+    """
+    model = load_checkpoint(path)
+    output = model.output
+    output_path = run_kwargs.get('output_path', output["path"]) if output is not None else None
+    if output_path is not None and os.fspath(output_path) == output["path"]:
+        run_kwargs = dict(run_kwargs, output_path=output["path"], output_format=output["format"], append=True)
+    model.run_model(n_steps, **run_kwargs)
+    return model
+
+def fork(model, num_branches=1, seeds=None):
+    """
+    Copies a (warmed-up) model into independent branches for what-if
+    scenarios. Without seeds the branches are exact copies that continue
+    exactly like the original; with seeds (one per branch) each branch's
+    random streams are re-derived from its seed so the branches diverge.
+    """
+    if seeds is not None:
+        num_branches = len(seeds)
+    buffer = io.BytesIO()
+    save_checkpoint(model, buffer)
+    branches = []
+    for i in range(num_branches):
+        buffer.seek(0)
+        branch = load_checkpoint(buffer)
+        if seeds is not None:
+            branch.reseed(seeds[i])
+        branches.append(branch)
+    return branches
@@ -0,0 +1,227 @@
+# engine.py
+
+import numpy as np
+from agents import AI_ATTITUDES, AI_ATTITUDE_WEIGHTS
+from kernels import CompiledLoop
+from networks import to_csr
+
+UPDATE_MODES = ('sequential', 'synchronous')
+
+def builtin_sequential_agents(knowledge, expertise, modifier, attitude, social, org, uplift, decay,
+                              positive, negative, most_positive):
+    """
+    The per-agent loop of the sequential update mode with the built-in rule
+    kernels written out, updating knowledge and attitude in place. uplift
+    holds the AI uplift per attitude code. Runs on plain Python lists, or on
+    arrays as compiled code (see _builtin_sequential_loop).
+    """
+    for i in range(len(knowledge)):
+        knowledge[i] = max(0.0, knowledge[i] - decay)
+        for partner in (social[i], org[i]):
+            if partner >= 0:
+                avg_knowledge = (knowledge[i] + knowledge[partner]) / 2
+                knowledge[i] = avg_knowledge * modifier[i]
+                knowledge[partner] = avg_knowledge * modifier[partner]
+        current = attitude[i]
+        knowledge[i] += uplift[current]
+        knowledge_change = knowledge[i] - expertise[i]
+        if knowledge_change > positive:
+            if current < most_positive:
+                attitude[i] = current + 1
+        elif knowledge_change < negative:
+            if current > 0:
+                attitude[i] = current - 1
+
+_builtin_sequential_loop = CompiledLoop(builtin_sequential_agents)
+
+def sequential_agents(knowledge, expertise, modifier, attitude, social, org, contribution, decay,
+                      positive, negative, interaction, ai_uplift, attitude_rule):
+    """
+    The per-agent loop of the sequential update mode for custom rule
+    kernels, applying their scalar functions in place. Runs on lists from
+    Python, or on arrays as compiled code (see _sequential_loop) when every
+    kernel can be compiled with Numba.
+    """
+    for i in range(len(knowledge)):
+        knowledge[i] = max(0.0, knowledge[i] - decay)
+        for partner in (social[i], org[i]):
+            if partner >= 0:
+                own, other = knowledge[i], knowledge[partner]
+                knowledge[i] = interaction(own, other, modifier[i])
+                knowledge[partner] = interaction(other, own, modifier[partner])
+        current = attitude[i]
+        knowledge[i] += float(ai_uplift(current, contribution))
+        attitude[i] = attitude_rule(current, knowledge[i] - expertise[i], positive, negative)
+
+_sequential_loop = CompiledLoop(sequential_agents, cache=False)
+
+def sample_partners(rng, indptr, indices, num_agents):
+    """
+    Draws one uniformly random neighbor per row of CSR adjacency with rng.
+    Rows without neighbors, and neighbors that are not agents (at or beyond
+    num_agents, like the AI node or org positions beyond the employees, or
+    marked -1), give -1.
+    """
+    degree = np.diff(indptr)
+    partners = np.full(len(degree), -1, dtype=np.int64)
+    active = np.flatnonzero(degree)
+    offsets = (rng.random(active.size) * degree[active]).astype(np.int64)
+    partners[active] = indices[indptr[active] + offsets]
+    partners[partners >= num_agents] = -1
+    return partners
+
+def average_proposals(knowledge, participants, proposals):
+    """
+    Sets the knowledge of every participant to the mean of the values
+    proposed for it (one per interaction it took part in); everyone else
+    keeps theirs.
+    """
+    totals = np.bincount(participants, weights=proposals, minlength=len(knowledge))
+    counts = np.bincount(participants, minlength=len(knowledge))
+    touched = counts > 0
+    knowledge[touched] = totals[touched] / counts[touched]
+    return knowledge
+
+def interact(knowledge, partners, behavior_modifier, rules):
+    """
+    Applies one phase of pairwise interactions synchronously: every agent
+    with a partner (partners[i] >= 0) interacts with it through the
+    interaction kernel of rules, against the values at the start of the phase.
+    """
+    actors = np.flatnonzero(partners >= 0)
+    targets = partners[actors]
+    interaction = rules.interaction
+    actor_knowledge, target_knowledge = knowledge[actors], knowledge[targets]
+    participants = np.concatenate([actors, targets])
+    proposals = np.concatenate([
+        interaction(actor_knowledge, target_knowledge, behavior_modifier[actors]),
+        interaction(target_knowledge, actor_knowledge, behavior_modifier[targets])])
+    return average_proposals(knowledge, participants, proposals)
+
+class ArrayEngine:
+    """
+    Batched NumPy implementation of OrganizationModel.step.
+
+    Works directly on the arrays of the model's AgentPopulation and on CSR
+    adjacency of both networks, so partner sampling, decay, AI uplift and
+    attitude transitions run as array operations. The behavioral rules are
+    the model's rule kernels (see kernels.py).
+
+    Update modes:
+        'sequential': Same semantics as the agent loop. Agents act one after
+            another in id order; each one decays, averages with a social
+            partner and then an org partner (both sides of a pair change
+            immediately), takes the AI uplift and updates its attitude before
+            the next agent acts. Partner draws are batched, the knowledge
+            updates run in a tight loop over plain Python lists, compiled
+            with Numba when it is installed and the process has run enough
+            updates for compiling to pay off.
+        'synchronous': Every phase (decay, social, org, AI, attitude) is
+            applied to all agents at once against the values at the start of
+            that phase. An agent that takes part in several interactions in
+            one phase, as initiator or as partner, ends up with the mean of the
+            values those interactions propose. Fully vectorized and much
+            faster, but agents no longer see updates made earlier in the step.
+    """
+    schedules_model_events = False
+
+    def __init__(self, model, update_mode='sequential'):
+        if update_mode not in UPDATE_MODES:
+            raise ValueError("Unsupported update mode.")
+        self.model = model
+        self.update_mode = update_mode
+        self.num_employees = model.num_employees
+        self.rng = model.rng
+
+        self.population = model.population
+        self.behavior_modifier = self.population.behavior_modifier
+        self.rules = model.rules
+
+        self.social_csr = to_csr(model.social_network, self.num_employees, model.social_edges.edges)
+        self.org_csr = model.org_chart.csr(self.num_employees)
+
+    def network_changed(self):
+        """
+        Rebuilds the social adjacency after the social network was modified.
+        """
+        self.social_csr = to_csr(self.model.social_network, self.num_employees,
+                                 self.model.social_edges.edges)
+
+    def step(self, timer=None):
+        """
+        Advances all employees by one step and records their AI usage,
+        charging each phase to timer (a profiling.PhaseTimer) when given.
+        """
+        contribution = self.model.ai_agent.knowledge_contribution
+        if self.update_mode == 'sequential':
+            self._step_sequential(contribution, timer)
+        else:
+            self._step_synchronous(contribution, timer)
+        self.model.ai_agent.usage_count += self.num_employees
+
+    def _step_sequential(self, contribution, timer=None):
+        model = self.model
+        social = sample_partners(self.rng, *self.social_csr, self.num_employees)
+        if timer is not None:
+            timer.lap('social')
+        org = sample_partners(self.rng, *self.org_csr, self.num_employees)
+        if timer is not None:
+            timer.lap('org')
+        population = self.population
+        rules = self.rules
+        decay = float(model.knowledge_decay_rate)
+        positive = model.attitude_positive_threshold
+        negative = model.attitude_negative_threshold
+        if rules.builtin:
+            uplift = [contribution * weight for weight in AI_ATTITUDE_WEIGHTS]
+            args = (decay, positive, negative, len(AI_ATTITUDES) - 1)
+            if _builtin_sequential_loop.use_compiled(self.num_employees):
+                _builtin_sequential_loop(population.knowledge, population.expertise, self.behavior_modifier,
+                                         population.ai_attitude, social, org, np.array(uplift), *args)
+            else:
+                knowledge = population.knowledge.tolist()
+                attitude = population.ai_attitude.tolist()
+                builtin_sequential_agents(knowledge, population.expertise.tolist(), self.behavior_modifier.tolist(),
+                                          attitude, social.tolist(), org.tolist(), uplift, *args)
+                population.knowledge[:] = knowledge
+                population.ai_attitude[:] = attitude
+        elif rules.jit and _sequential_loop.use_compiled(self.num_employees):
+            _sequential_loop(population.knowledge, population.expertise, self.behavior_modifier,
+                             population.ai_attitude, social, org, float(contribution), decay, positive, negative,
+                             rules.interaction.scalar, rules.ai_uplift.scalar, rules.attitude.scalar)
+        else:
+            knowledge = population.knowledge.tolist()
+            attitude = population.ai_attitude.tolist()
+            sequential_agents(knowledge, population.expertise.tolist(), self.behavior_modifier.tolist(), attitude,
+                              social.tolist(), org.tolist(), float(contribution), decay, positive, negative,
+                              rules.interaction.function, rules.ai_uplift.function, rules.attitude.function)
+            population.knowledge[:] = knowledge
+            population.ai_attitude[:] = attitude
+        if timer is not None:
+            timer.lap('agents')
+
+    def _step_synchronous(self, contribution, timer=None):
+        model = self.model
+        population = self.population
+        knowledge = np.maximum(population.knowledge - model.knowledge_decay_rate, 0.0)
+        if timer is not None:
+            timer.lap('decay')
+        knowledge = interact(knowledge, sample_partners(self.rng, *self.social_csr, self.num_employees),
+                             self.behavior_modifier, self.rules)
+        if timer is not None:
+            timer.lap('social')
+        knowledge = interact(knowledge, sample_partners(self.rng, *self.org_csr, self.num_employees),
+                             self.behavior_modifier, self.rules)
+        if timer is not None:
+            timer.lap('org')
+        rules = self.rules
+        knowledge += rules.ai_uplift(population.ai_attitude, contribution)
+        if timer is not None:
+            timer.lap('ai_interaction')
+
+        population.ai_attitude[:] = rules.attitude(population.ai_attitude, knowledge - population.expertise,
+                                                   model.attitude_positive_threshold,
+                                                   model.attitude_negative_threshold)
+        population.knowledge[:] = knowledge
+        if timer is not None:
+            timer.lap('attitude')
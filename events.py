@@ -0,0 +1,36 @@
+# events.py
+
+class EventHooks:
+    """
+    Registry of callbacks for model events. The model only builds event
+    arguments when an event has listeners, so unused hooks cost nothing.
+
+    Events and callback signatures:
+        'ai_evolved': callback(model, change, knowledge_contribution), where
+            change is 'evolved' or 'diminished' (the contribution rose or fell)
+        'network_modified': callback(model, action, num_edges), where action
+            is 'add' or 'remove' and num_edges the number of edges changed
+        'step_completed': callback(model, step)
+    """
+    EVENTS = ('ai_evolved', 'network_modified', 'step_completed')
+
+    def __init__(self):
+        self.listeners = {event: [] for event in self.EVENTS}
+
+    def add_listener(self, event, callback):
+        """
+        Registers callback for event.
+        """
+        if event not in self.listeners:
+            raise ValueError("Unsupported event.")
+        self.listeners[event].append(callback)
+
+    def remove_listener(self, event, callback):
+        """
+        Unregisters a callback previously added for event.
+        """
+        self.listeners[event].remove(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            callback(*args)
@@ -0,0 +1,146 @@
+# hierarchy.py
+
+from collections import deque
+import numpy as np
+
+class HierarchyIndex:
+    """
+    Array index over the reporting tree of an organizational network, built
+    once so that levels, managers and subtrees are lookups instead of graph
+    walks.
+
+    Attributes (indexed by node id):
+        parent: Direct manager of each node (-1 for the top of the hierarchy)
+        level: Depth in the hierarchy (0 for the top)
+        start, end: The node and everyone under it occupy order[start:end]
+        order: All nodes in depth-first preorder
+    """
+    def __init__(self, parent):
+        """
+        Builds the index from a parent array; nodes whose parent is -1 are roots.
+        """
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.size = len(self.parent)
+        self.level = self._compute_levels()
+
+        # Group nodes by level, and by manager within a level
+        by_level = np.lexsort((np.arange(self.size), self.parent, self.level))
+        level_bounds = np.searchsorted(self.level[by_level], np.arange(self.level.max(initial=0) + 2))
+        levels = [by_level[level_bounds[l]:level_bounds[l + 1]] for l in range(len(level_bounds) - 1)]
+
+        # Subtree sizes, accumulated from the deepest level up
+        subtree_size = np.ones(self.size, dtype=np.int64)
+        for nodes in reversed(levels[1:]):
+            subtree_size += np.bincount(self.parent[nodes], weights=subtree_size[nodes],
+                                        minlength=self.size).astype(np.int64)
+
+        # Preorder positions: a node follows its manager and earlier siblings' subtrees
+        self.start = np.zeros(self.size, dtype=np.int64)
+        if levels:
+            roots = levels[0]
+            self.start[roots] = np.cumsum(subtree_size[roots]) - subtree_size[roots]
+        for nodes in levels[1:]:
+            managers = self.parent[nodes]
+            before = np.cumsum(subtree_size[nodes]) - subtree_size[nodes]
+            first_sibling = np.searchsorted(managers, managers)
+            self.start[nodes] = self.start[managers] + 1 + before - before[first_sibling]
+        self.end = self.start + subtree_size
+        self.order = np.empty(self.size, dtype=np.int64)
+        self.order[self.start] = np.arange(self.size)
+
+        # Direct reports as CSR, grouped by manager
+        has_manager = np.flatnonzero(self.parent >= 0)
+        by_manager = has_manager[np.argsort(self.parent[has_manager], kind='stable')]
+        self.report_indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parent[has_manager], minlength=self.size),
+                  out=self.report_indptr[1:])
+        self.report_indices = by_manager
+
+    def _compute_levels(self):
+        """
+        Depth of every node by pointer jumping (O(N log depth)).
+        """
+        ancestor = self.parent.copy()
+        level = (ancestor >= 0).astype(np.int64)
+        active = np.flatnonzero(ancestor >= 0)
+        while active.size:
+            jump = ancestor[active]
+            level[active] += level[jump]
+            ancestor[active] = ancestor[jump]
+            active = active[ancestor[active] >= 0]
+        return level
+
+    @classmethod
+    def from_graph(cls, G, root=0):
+        """
+        Builds the index from an organizational network with integer nodes.
+        The reporting tree is the breadth-first tree from root along edge
+        direction, so extra (e.g. lateral) edges don't create extra managers.
+        """
+        num_nodes = max(G, default=-1) + 1
+        parent = [-1] * num_nodes
+        seen = [False] * num_nodes
+        if root in G:
+            seen[root] = True
+            queue = deque([root])
+            while queue:
+                manager = queue.popleft()
+                for report in G.successors(manager):
+                    if not seen[report]:
+                        seen[report] = True
+                        parent[report] = manager
+                        queue.append(report)
+        return cls(parent)
+
+    def levels_of(self, node_ids):
+        """
+        Levels of the given nodes; nodes outside the hierarchy get -1.
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        levels = np.full(node_ids.shape, -1, dtype=np.int64)
+        inside = (node_ids >= 0) & (node_ids < self.size)
+        levels[inside] = self.level[node_ids[inside]]
+        return levels
+
+    def direct_reports(self, manager):
+        """
+        Nodes reporting directly to manager.
+        """
+        return self.report_indices[self.report_indptr[manager]:self.report_indptr[manager + 1]]
+
+    def reports_under(self, manager):
+        """
+        All nodes below manager (direct and indirect reports), as a view into order.
+        """
+        return self.order[self.start[manager] + 1:self.end[manager]]
+
+    def is_under(self, nodes, manager):
+        """
+        Whether each of nodes is a direct or indirect report of manager.
+        """
+        positions = self.start[np.asarray(nodes, dtype=np.int64)]
+        return (positions > self.start[manager]) & (positions < self.end[manager])
+
+    def manager_chain(self, node):
+        """
+        Managers of node from its direct manager up to the top.
+        """
+        chain = []
+        node = self.parent[node]
+        while node >= 0:
+            chain.append(node)
+            node = self.parent[node]
+        return np.array(chain, dtype=np.int64)
+
+    def ancestors_at_level(self, nodes, level):
+        """
+        For each node, its manager at the given level (the node itself if it
+        is at that level, -1 if it is above it).
+        """
+        nodes = np.array(nodes, dtype=np.int64)
+        current = nodes.copy()
+        for _ in range(int(self.level[nodes].max(initial=0)) - level):
+            deeper = self.level[current] > level
+            current[deeper] = self.parent[current[deeper]]
+        current[self.level[nodes] < level] = -1
+        return current
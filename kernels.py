@@ -0,0 +1,241 @@
+# kernels.py
+
+import importlib.util
+import numpy as np
+from agents import AI_ATTITUDES, AI_ATTITUDE_WEIGHTS
+
+# Numba is optional and only imported when something is first compiled, so
+# importing the model (and starting worker processes) stays cheap
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Rules and the arguments their kernels take, elementwise
+RULES = {
+    'interaction': ('knowledge', 'partner_knowledge', 'behavior_modifier'),
+    'ai_uplift': ('attitude', 'contribution'),
+    'attitude': ('attitude', 'knowledge_change', 'positive_threshold', 'negative_threshold'),
+    'ai_evolution': ('usage_count', 'contribution', 'threshold', 'decrement_threshold', 'increment'),
+}
+# Types the rules' kernels are compiled for as ufuncs; other input types are cast to them
+SIGNATURES = {
+    'interaction': 'float64(float64, float64, float64)',
+    'ai_uplift': 'float64(int64, float64)',
+    'attitude': 'int64(int64, float64, float64, float64)',
+    'ai_evolution': 'float64(int64, float64, float64, float64, float64)',
+}
+BUILTIN = 'builtin'
+
+_KERNELS = {rule: {} for rule in RULES}
+
+def njit(function, cache=True):
+    """
+    function compiled with numba.njit, cached on disk unless cache is False
+    or function has no source file to cache it next to (e.g. one defined
+    interactively).
+    """
+    import numba
+
+    if cache:
+        try:
+            return numba.njit(cache=True)(function)
+        except RuntimeError:
+            pass
+    return numba.njit(function)
+
+def compile_ufunc(function, signature):
+    """
+    function compiled as a NumPy ufunc for one signature, cached on disk
+    where possible (see njit).
+    """
+    import numba
+
+    try:
+        return numba.vectorize([signature], cache=True)(function)
+    except RuntimeError:
+        return numba.vectorize([signature])(function)
+
+class Kernel:
+    """
+    One implementation of a rule: a plain function of scalars written with
+    arithmetic that also broadcasts over NumPy arrays (comparisons combined
+    with &, np.maximum instead of max, no if on values).
+
+    function is the plain function, used as is when stepping one agent at a
+    time from Python. vectorized applies the rule to whole arrays: a ufunc
+    compiled for the rule's signature when Numba is installed and jit and
+    vectorize are set, otherwise function itself as NumPy code. scalar is
+    the njit-compiled function that compiled loops call per agent (function
+    without Numba). Both are compiled on first use and cached on disk, so
+    only processes that use them pay for importing Numba and compiling.
+    """
+    def __init__(self, rule, name, function, jit=True, vectorize=True):
+        self.rule = rule
+        self.name = name
+        self.function = function
+        self.jit = jit and NUMBA_AVAILABLE
+        self.vectorize = vectorize and self.jit
+        self._scalar = None
+        self._vectorized = None
+
+    @property
+    def scalar(self):
+        if self._scalar is None:
+            self._scalar = njit(self.function) if self.jit else self.function
+        return self._scalar
+
+    @property
+    def vectorized(self):
+        if self._vectorized is None:
+            self._vectorized = (compile_ufunc(self.function, SIGNATURES[self.rule]) if self.vectorize
+                                else self.function)
+        return self._vectorized
+
+    def __call__(self, *args):
+        return self.vectorized(*args)
+
+    def __repr__(self):
+        return f"Kernel({self.rule!r}, {self.name!r}, jit={self.jit})"
+
+def register_kernel(rule, name, jit=True, vectorize=True):
+    """
+    Decorator that registers a function as the kernel name of rule, so models
+    can select it with rules={rule: name}. Kernels compile with Numba when it
+    is installed (unless jit is False; vectorize False keeps applying them
+    to arrays as NumPy code) and run as NumPy code otherwise.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown rule {rule!r}; rules are {', '.join(RULES)}.")
+
+    def decorator(function):
+        _KERNELS[rule][name] = Kernel(rule, name, function, jit, vectorize)
+        return function
+    return decorator
+
+def get_kernel(rule, name=BUILTIN):
+    """
+    The registered kernel name of rule.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown rule {rule!r}; rules are {', '.join(RULES)}.")
+    try:
+        return _KERNELS[rule][name]
+    except KeyError:
+        raise ValueError(f"No kernel {name!r} is registered for rule {rule!r}.") from None
+
+def kernel_names(rule):
+    """
+    Names of the kernels registered for rule.
+    """
+    return list(_KERNELS[rule])
+
+class Rules:
+    """
+    The kernel a model uses for each rule, as attributes named after the
+    rules, from a {rule: kernel name} dict; rules not given use the built-in
+    kernel.
+    """
+    def __init__(self, names=None):
+        names = dict(names or {})
+        unknown = set(names) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}.")
+        self.names = {rule: names.get(rule, BUILTIN) for rule in RULES}
+        for rule, name in self.names.items():
+            setattr(self, rule, get_kernel(rule, name))
+
+    @property
+    def jit(self):
+        """
+        Whether every kernel can be compiled, so whole loops over agents can be.
+        """
+        return all(getattr(self, rule).jit for rule in RULES)
+
+    @property
+    def builtin(self):
+        """
+        Whether every rule uses its built-in kernel.
+        """
+        return all(name == BUILTIN for name in self.names.values())
+
+class CompiledLoop:
+    """
+    A loop over agents that runs as plain Python (function, on lists) until
+    this process has run it for compile_after agent updates, and from then on
+    as compiled code on arrays when Numba is installed. Importing Numba and
+    compiling or loading the loop costs about a second per process while the
+    compiled loop saves a microsecond or two per update, so short runs never
+    pay for it. Both forms must give identical results, so switching in the
+    middle of a run changes nothing. Loops that take kernels' scalar
+    functions as arguments can't be cached on disk (cache=False), since their
+    compiled code is specific to those functions.
+    """
+    def __init__(self, function, cache=True, compile_after=500_000):
+        self.function = function
+        self.cache = cache
+        self.compile_after = compile_after
+        self.python_updates = 0
+        self.compiled = None
+
+    def use_compiled(self, num_updates):
+        """
+        Whether to run the next num_updates agent updates compiled (counting
+        them toward compile_after when not).
+        """
+        if not NUMBA_AVAILABLE:
+            return False
+        if self.compiled is None:
+            if self.python_updates < self.compile_after:
+                self.python_updates += num_updates
+                return False
+            self.compiled = njit(self.function, self.cache)
+        return True
+
+    def __call__(self, *args):
+        return self.compiled(*args)
+
+# Attitude weights as an array so the uplift indexes it with codes or code arrays
+ATTITUDE_WEIGHTS = np.array(AI_ATTITUDE_WEIGHTS)
+MOST_POSITIVE = len(AI_ATTITUDES) - 1
+
+# The built-in kernels run on arrays as NumPy code: compiled ufuncs gain a few
+# milliseconds per million agents but cost every process a Numba import and
+# compilation. Their compiled forms are only used by loops over agents.
+
+@register_kernel('interaction', BUILTIN, vectorize=False)
+def average_knowledge(knowledge, partner_knowledge, behavior_modifier):
+    """
+    Both sides of an interaction move to the pair's mean knowledge, scaled by
+    their own role's behavior modifier.
+    """
+    return (knowledge + partner_knowledge) / 2 * behavior_modifier
+
+@register_kernel('ai_uplift', BUILTIN, vectorize=False)
+def weighted_uplift(attitude, contribution):
+    """
+    An employee takes up the share AI_ATTITUDE_WEIGHTS[attitude] of the AI's
+    contribution.
+    """
+    return contribution * ATTITUDE_WEIGHTS[attitude]
+
+@register_kernel('attitude', BUILTIN, vectorize=False)
+def threshold_attitude(attitude, knowledge_change, positive_threshold, negative_threshold):
+    """
+    One step more positive when knowledge rose above expertise by more than
+    positive_threshold, one step more negative when it fell below
+    negative_threshold, within the range of attitudes.
+    """
+    more_positive = (knowledge_change > positive_threshold) & (attitude < MOST_POSITIVE)
+    more_negative = ((knowledge_change <= positive_threshold) & (knowledge_change < negative_threshold)
+                     & (attitude > 0))
+    return attitude + more_positive - more_negative
+
+@register_kernel('ai_evolution', BUILTIN, vectorize=False)
+def threshold_evolution(usage_count, contribution, threshold, decrement_threshold, increment):
+    """
+    The contribution grows by increment when usage exceeds threshold and
+    shrinks by it (to no less than 0.5) when usage is below decrement_threshold.
+    """
+    evolved = usage_count > threshold
+    diminished = (usage_count <= threshold) & (usage_count < decrement_threshold)
+    unchanged = 1 - evolved - diminished
+    return (evolved * (contribution + increment) + diminished * np.maximum(0.5, contribution - increment)
+            + unchanged * contribution)
@@ -1,8 +1,12 @@
 # main.py
 
+import logging
 from model import OrganizationModel
 
 def main():
+    # Show the model's progress messages on the console
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     # Initialize the model with desired parameters
     model = OrganizationModel(
         num_employees=100,         # Total number of employees
@@ -22,7 +26,14 @@ def main():
         attitude_negative_threshold=-0.5, # Threshold to become more negative
         dynamic_network=True,      # Enable dynamic network changes
         network_change_frequency=10, # Steps between network changes
-        num_edges_change=5          # Number of edges to add/remove during each network change
+        num_edges_change=5,         # Number of edges to add/remove during each network change
+        engine='agent',             # 'agent' (one object at a time), 'array' (batched NumPy) or 'event'
+        update_mode='sequential',   # Array engine: 'sequential' or 'synchronous'
+        seed=None,                  # Seed for reproducible runs (None for a fresh one)
+        quiet=False,                # Suppress progress logging
+        fit_org_to_employees=False, # Size the org chart to exactly num_employees positions
+        activity_rates=None,        # Event engine: actions per step (one number or one per employee)
+        num_shards=None             # Partitioned engine: worker processes (None for the number of cores)
     )
 
     # Optionally, visualize the networks before running the model
@@ -0,0 +1,59 @@
+# metrics.py
+
+class MetricsTracker:
+    """
+    Keeps the organization-wide metrics collected every step up to date
+    incrementally instead of recomputing them from all agents.
+
+    Knowledge totals and attitude counts are adjusted as single agents change
+    (the AgentPopulation reports changes made through EmployeeView objects);
+    bulk updates by the array engine are folded in with refresh_agents. The
+    average degree centrality of the social network is 2E / (N(N - 1)) and is
+    cached until network_changed is called.
+    """
+    def __init__(self, population, social_edges):
+        """
+        Parameters:
+            population: AgentPopulation to track
+            social_edges: EdgePool of the social network
+        """
+        self.population = population
+        self.social_edges = social_edges
+        self.refresh_agents()
+        self.network_changed()
+
+    def refresh_agents(self):
+        """
+        Recomputes the knowledge total and attitude counts from the population
+        arrays (after bulk updates, and periodically to shed rounding drift).
+        """
+        self.knowledge_total = float(self.population.knowledge.sum())
+        self.attitude_counts = self.population.attitude_counts().tolist()
+
+    def knowledge_changed(self, old, new):
+        self.knowledge_total += new - old
+
+    def attitude_changed(self, old, new):
+        self.attitude_counts[old] -= 1
+        self.attitude_counts[new] += 1
+
+    def network_changed(self):
+        """
+        Invalidates the cached network centrality.
+        """
+        self._network_centrality = None
+
+    def average_knowledge(self):
+        return self.knowledge_total / self.population.size
+
+    def network_centrality(self):
+        """
+        Average degree centrality of the social network.
+        """
+        if self._network_centrality is None:
+            num_nodes = len(self.social_edges.nodes)
+            if num_nodes > 1:
+                self._network_centrality = 2 * len(self.social_edges) / (num_nodes * (num_nodes - 1))
+            else:
+                self._network_centrality = 0.0
+        return self._network_centrality
@@ -1,24 +1,43 @@
 # model.py
 
-import random
-import networkx as nx
-import pandas as pd
-import matplotlib.pyplot as plt
+import logging
 import os
-from agents import EmployeeAgent, GenerativeAI
+import random
+import numpy as np
+from agents import AI_ATTITUDES, ROLES, AgentPopulation, AgentSequence, GenerativeAI
+from engine import ArrayEngine
+from scheduler import EventScheduler
+from diffusion import DiffusionEngine
+from partition import PartitionedEngine
+from sharedgraph import SharedGraph
+from metrics import MetricsTracker
+from sinks import open_sink, result_format
+from recorder import TrajectoryRecorder
+from events import EventHooks
+from hierarchy import HierarchyIndex
+from profiling import PhaseTimer
+from stopping import as_criteria
+from kernels import Rules
+import checkpoint
 from networks import (
-    create_hierarchical_network,
-    create_onion_network,
+    build_org_chart,
+    org_size,
     create_small_world_network,
     create_scale_free_network,
     add_random_edges,
-    remove_random_edges
+    remove_random_edges,
+    EdgePool
 )
 
+logger = logging.getLogger(__name__)
+
 class OrganizationModel:
     """
     The main model representing the organization.
     """
+    # Steps between full recomputations of the incrementally tracked metrics
+    METRICS_REFRESH_INTERVAL = 1000
+
     def __init__(self, 
                  num_employees=100, 
                  num_levels=5,  # Adjusted to 5 to include all agents
@@ -37,14 +56,24 @@ class OrganizationModel:
                  attitude_negative_threshold=-0.5,
                  dynamic_network=True,
                  network_change_frequency=10,
-                 num_edges_change=5):
+                 num_edges_change=5,
+                 engine='agent',
+                 update_mode='sequential',
+                 seed=None,
+                 quiet=False,
+                 fit_org_to_employees=False,
+                 activity_rates=None,
+                 num_shards=None,
+                 social_graph=None,
+                 rules=None):
         """
         Initialize the organization model.
 
         Parameters:
             num_employees: Number of human agents
             num_levels: Number of hierarchical levels (for organizational networks)
-            span_of_control: Number of direct reports per manager
+            span_of_control: Number of direct reports per manager (an int, or a list
+                of spans per level whose last entry repeats)
             org_network_type: 'hierarchical' or 'onion'
             social_network_type: 'small_world' or 'scale_free'
             social_k: Parameter for social network (e.g., neighbors in small-world)
@@ -60,34 +89,63 @@ class OrganizationModel:
             dynamic_network: Boolean indicating if social network should change over time
             network_change_frequency: Steps between network changes
             num_edges_change: Number of edges to add/remove during each network change
+            engine: 'agent' to step employees one by one through the EmployeeAgent API, 'array'
+                for the batched NumPy engine (see engine.ArrayEngine), or 'event' for the
+                event-driven scheduler with per-employee activity (see scheduler.EventScheduler),
+                or 'diffusion' for the mean-field sparse-matrix engine (see diffusion.DiffusionEngine),
+                or 'partitioned' to split the employees across worker processes (see
+                partition.PartitionedEngine)
+            update_mode: 'sequential' or 'synchronous' update order for the array engine
+            seed: Seed for this model's random streams (None for fresh entropy)
+            quiet: Skip all progress logging (for batch runs)
+            fit_org_to_employees: Size the org chart to exactly num_employees
+                positions (num_levels is then ignored) instead of num_levels full levels
+            activity_rates: Actions per step for the 'event' engine, one number or one
+                per employee (None for 1.0)
+            num_shards: Worker processes for the 'partitioned' engine (None for the number of cores)
+            social_graph: Name of a sharedgraph.SharedNetwork to attach to as the social
+                network (with num_employees + 1 nodes) instead of building one; the
+                social network arguments are then ignored
+            rules: Kernel name per behavioral rule, e.g. {'interaction': 'my_rule'} (see
+                kernels.py); None or missing rules use the built-in kernels
         """
-        self.num_employees = num_employees
-        self.knowledge_decay_rate = knowledge_decay_rate
-        self.ai_evolution_threshold = ai_evolution_threshold
-        self.ai_evolution_decrement_threshold = ai_evolution_decrement_threshold
-        self.ai_evolution_increment = ai_evolution_increment
-        self.attitude_positive_threshold = attitude_positive_threshold
-        self.attitude_negative_threshold = attitude_negative_threshold
-
-        self.dynamic_network = dynamic_network
-        self.network_change_frequency = network_change_frequency
-        self.num_edges_change = num_edges_change
-        self.current_step = 0
+        # Constructor arguments, kept for checkpoints and forks
+        self.params = {name: value for name, value in locals().items() if name != 'self'}
+        if np.ndim(activity_rates):
+            self.params['activity_rates'] = np.asarray(activity_rates, dtype=np.float64).tolist()
+        self.configure(self.params)
+
+        # Per-model random streams derived from seed: a NumPy Generator for
+        # batched draws and a random.Random for per-agent and networkx draws
+        self.random = random.Random()
+        self.rng = np.random.default_rng()
+        self.reseed(seed)
 
         # Create Organizational Network
+        if fit_org_to_employees:
+            num_positions = num_employees
+        else:
+            num_positions = org_size(num_levels, span_of_control)
         if org_network_type == 'hierarchical':
-            self.org_network = create_hierarchical_network(num_levels, span_of_control)
+            self.org_chart = build_org_chart(num_positions, span_of_control)
         elif org_network_type == 'onion':
-            self.org_network = create_onion_network(num_levels, span_of_control)
+            self.org_chart = build_org_chart(num_positions, span_of_control,
+                                             lateral_probability=0.3, seed=self.rng)
         else:
             raise ValueError("Unsupported organizational network type.")
+        self.hierarchy = HierarchyIndex(self.org_chart.parent)
 
         # Create Social Interaction Network
         total_agents = num_employees + 1  # +1 for AI agent
-        if social_network_type == 'small_world':
-            self.social_network = create_small_world_network(total_agents, social_k, social_p)
+        if social_graph is not None:
+            self.social_network = SharedGraph.attach(social_graph)
+            if self.social_network.number_of_nodes() != total_agents:
+                raise ValueError("The shared social network must have num_employees + 1 nodes.")
+        elif social_network_type == 'small_world':
+            self.social_network = create_small_world_network(total_agents, social_k, social_p,
+                                                             seed=self.random)
         elif social_network_type == 'scale_free':
-            self.social_network = create_scale_free_network(total_agents, social_m)
+            self.social_network = create_scale_free_network(total_agents, social_m, seed=self.random)
         else:
             raise ValueError("Unsupported social network type.")
 
@@ -96,19 +154,35 @@ class OrganizationModel:
         self.ai_agent = GenerativeAI(ai_unique_id, ai_contribution)
 
         # Initialize Agents
-        self.agents = []
+        self.population = AgentPopulation(num_employees)
         roles = ['Manager', 'Specialist', 'Staff']
         role_probabilities = [0.2, 0.3, 0.5]  # Adjust as needed
 
-        for i in range(num_employees):
-            role = self.assign_role(i, num_levels, span_of_control, roles, role_probabilities)
-            expertise = random.uniform(1, 10)
-            ai_attitude = self.assign_ai_attitude()
-            agent = EmployeeAgent(i, role, expertise, ai_attitude)
-            self.agents.append(agent)
+        self.population.assign(self.assign_roles(roles, role_probabilities),
+                               self.rng.uniform(1, 10, num_employees),
+                               self.assign_ai_attitudes())
 
-        # Place AI agent
-        self.agents.append(self.ai_agent)  # Index num_employees
+        self.setup()
+
+    def configure(self, params):
+        """
+        Sets the scalar parameters and empty run state from the constructor arguments.
+        """
+        self.num_employees = params['num_employees']
+        self.knowledge_decay_rate = params['knowledge_decay_rate']
+        self.ai_evolution_threshold = params['ai_evolution_threshold']
+        self.ai_evolution_decrement_threshold = params['ai_evolution_decrement_threshold']
+        self.ai_evolution_increment = params['ai_evolution_increment']
+        self.attitude_positive_threshold = params['attitude_positive_threshold']
+        self.attitude_negative_threshold = params['attitude_negative_threshold']
+
+        self.dynamic_network = params['dynamic_network']
+        self.network_change_frequency = params['network_change_frequency']
+        self.num_edges_change = params['num_edges_change']
+        self.current_step = 0
+        self.quiet = params['quiet']
+        self.rules = Rules(params.get('rules'))
+        self.events = EventHooks()
 
         # Data Storage
         self.data = {
@@ -120,67 +194,131 @@ class OrganizationModel:
             "AI Knowledge Contribution": [],
             "Network Centrality": []
         }
+        self.recorder = None  # Optional per-agent TrajectoryRecorder
+        self.profiler = None  # Optional PhaseTimer
+        self.stop_reason = None  # Why the last run_model ended early, if it did
+        self.output = None  # Result file of the last run_model and how much of it is written
 
-        # Ensure data directory exists
-        if not os.path.exists('data'):
-            os.makedirs('data')
-
-    def assign_role(self, agent_id, num_levels, span_of_control, roles, role_probs):
+    def setup(self, social_edges=None):
         """
-        Assigns a role to an agent based on hierarchical level and predefined probabilities.
+        Builds the derived structures (edge pool, step engine, metrics) once the
+        networks and population exist.
         """
-        # Determine hierarchical level
-        level = self.get_agent_level(agent_id)
-        if level == 0:
-            return 'CEO'
+        # O(1) random edge changes
+        if social_edges is None:
+            if isinstance(self.social_network, SharedGraph) and self.social_network.shared is not None:
+                social_edges = self.social_network.edge_pool()
+            else:
+                social_edges = EdgePool(self.social_network)
+        self.social_edges = social_edges
+
+        # Select the step engine
+        engine = self.params['engine']
+        if engine == 'agent':
+            self.engine = None
+        elif engine == 'array':
+            self.engine = ArrayEngine(self, self.params['update_mode'])
+        elif engine == 'event':
+            self.engine = EventScheduler(self, self.params.get('activity_rates'))
+        elif engine == 'diffusion':
+            self.engine = DiffusionEngine(self)
+        elif engine == 'partitioned':
+            self.engine = PartitionedEngine(self, self.params.get('num_shards'))
         else:
-            role = random.choices(roles, weights=role_probs, k=1)[0]
-            return role
+            raise ValueError("Unsupported engine.")
+
+        # Incrementally maintained metrics
+        self.metrics = MetricsTracker(self.population, self.social_edges)
+        self.population.tracker = self.metrics
+        self.population.rules = self.rules
+
+    def reseed(self, seed):
+        """
+        Re-derives both random streams from seed, in place.
+        """
+        python_seed, numpy_seed = np.random.SeedSequence(seed).spawn(2)
+        self.random.seed(int(python_seed.generate_state(1)[0]))
+        self.rng.bit_generator.state = np.random.default_rng(numpy_seed).bit_generator.state
+        self.params['seed'] = seed
+
+    def save_checkpoint(self, path):
+        """
+        Saves the full model state to path (see checkpoint.save_checkpoint).
+        """
+        checkpoint.save_checkpoint(self, path)
+
+    def fork(self, num_branches=1, seeds=None):
+        """
+        Returns independent copies of this model for what-if scenarios
+        (see checkpoint.fork).
+        """
+        return checkpoint.fork(self, num_branches, seeds)
+
+    @property
+    def org_network(self):
+        """
+        The organizational network as a networkx DiGraph (built on first use).
+        """
+        return self.org_chart.graph
+
+    @property
+    def agents(self):
+        """
+        All agents as objects: EmployeeView for ids below num_employees,
+        followed by the AI agent at index num_employees. Returns a lazy
+        AgentSequence, so indexing is cheap but iterating creates one view
+        per employee; use the population arrays in hot loops.
+        """
+        return AgentSequence(self.population, self.ai_agent)
+
+    def agent_at(self, agent_id):
+        """
+        Returns the agent with the given id (the AI agent has id num_employees).
+        """
+        if agent_id == self.num_employees:
+            return self.ai_agent
+        return self.population[agent_id]
+
+    def assign_roles(self, roles, role_probs):
+        """
+        Assigns role codes to all agents based on hierarchical level and predefined probabilities.
+        """
+        role_codes = np.array([ROLES.index(role) for role in roles], dtype=np.int8)
+        weights = np.asarray(role_probs, dtype=np.float64)
+        assigned = self.rng.choice(role_codes, size=self.num_employees, p=weights / weights.sum())
+        # The top of the hierarchy is the CEO
+        levels = self.hierarchy.levels_of(np.arange(self.num_employees))
+        assigned[levels == 0] = ROLES.index('CEO')
+        return assigned
 
     def get_agent_level(self, agent_id):
         """
-        Determines the hierarchical level of an agent in the organizational network.
+        Determines the hierarchical level of an agent in the organizational network
+        (-1 if the agent has no position in it).
         """
-        level = 0
-        current_id = agent_id
-        while True:
-            predecessors = list(self.org_network.predecessors(current_id))
-            if not predecessors:
-                break
-            current_id = predecessors[0]
-            level += 1
-        return level
+        return int(self.hierarchy.levels_of([agent_id])[0])
 
-    def assign_ai_attitude(self):
+    def assign_ai_attitudes(self):
         """
-        Assigns an initial attitude towards AI based on predefined probabilities.
+        Assigns initial attitude codes towards AI to all agents based on predefined probabilities.
         """
-        r = random.random()
-        if r < 0.5:
-            return 'positive'
-        elif r < 0.8:
-            return 'neutral'
-        else:
-            return 'negative'
+        r = self.rng.random(self.num_employees)
+        attitudes = np.full(self.num_employees, AI_ATTITUDES.index('negative'), dtype=np.int8)
+        attitudes[r < 0.8] = AI_ATTITUDES.index('neutral')
+        attitudes[r < 0.5] = AI_ATTITUDES.index('positive')
+        return attitudes
 
     def compute_average_knowledge(self):
         """
         Computes the average knowledge of all employees.
         """
-        total_knowledge = sum(agent.knowledge for agent in self.agents 
-                              if isinstance(agent, EmployeeAgent))
-        return total_knowledge / self.num_employees
+        return self.metrics.average_knowledge()
 
     def ai_utilization(self):
         """
         Calculates AI utilization based on agent attitudes.
         """
-        positive = sum(1 for agent in self.agents 
-                      if isinstance(agent, EmployeeAgent) and agent.ai_attitude == 'positive')
-        neutral = sum(1 for agent in self.agents 
-                     if isinstance(agent, EmployeeAgent) and agent.ai_attitude == 'neutral')
-        negative = sum(1 for agent in self.agents 
-                      if isinstance(agent, EmployeeAgent) and agent.ai_attitude == 'negative')
+        negative, neutral, positive = self.metrics.attitude_counts
         return {
             "Positive": positive,
             "Neutral": neutral,
@@ -195,69 +333,131 @@ class OrganizationModel:
 
     def compute_network_centrality(self):
         """
-        Computes centrality measures for the social network.
+        Computes the average degree centrality of the social network.
         """
-        centrality = nx.degree_centrality(self.social_network)
-        avg_centrality = sum(centrality.values()) / len(centrality)
-        return avg_centrality
+        return self.metrics.network_centrality()
 
     def step(self):
         """
         Advances the model by one step.
         """
         self.current_step += 1
+        timer = self.profiler
+        if timer is not None:
+            timer.start()
 
         # Agents interact with their networks
-        for agent in self.agents:
-            if isinstance(agent, EmployeeAgent):
-                # Knowledge decay
-                agent.knowledge = max(0, agent.knowledge - self.knowledge_decay_rate)
-
-                # Interact with social network
-                social_neighbors = list(self.social_network.neighbors(agent.unique_id))
-                if social_neighbors:
-                    partner_id = random.choice(social_neighbors)
-                    partner = self.agents[partner_id]
-                    agent.interact_with_agent(partner)
-
-                # Interact with organizational network
-                if agent.unique_id in self.org_network:
-                    org_neighbors = list(self.org_network.neighbors(agent.unique_id))
-                    if org_neighbors:
-                        org_partner_id = random.choice(org_neighbors)
-                        if org_partner_id < len(self.agents):  # Ensure within bounds
-                            org_partner = self.agents[org_partner_id]
-                            agent.interact_with_agent(org_partner)
-
-                # Interact with Generative AI
-                agent.interact_with_ai(self.ai_agent)
-
-                # Update AI Attitude
-                agent.update_ai_attitude(self)
-
-        # AI evolves based on usage
-        self.ai_agent.step(self)
-
-        # Handle dynamic network changes
-        if self.dynamic_network and self.current_step % self.network_change_frequency == 0:
-            self.modify_social_network()
+        if self.engine is not None:
+            self.engine.step(timer)
+            self.metrics.refresh_agents()
+        else:
+            self.step_agents(timer)
+            if self.current_step % self.METRICS_REFRESH_INTERVAL == 0:
+                self.metrics.refresh_agents()
+        if timer is not None:
+            timer.lap('metrics')
+
+        # The event engine runs AI evolution and network changes as scheduled events
+        if self.engine is None or not self.engine.schedules_model_events:
+            # AI evolves based on usage
+            self.step_ai()
+            if timer is not None:
+                timer.lap('ai_step')
+
+            # Handle dynamic network changes
+            if self.dynamic_network and self.current_step % self.network_change_frequency == 0:
+                self.modify_social_network()
+                if timer is not None:
+                    timer.lap('network')
 
         # Collect Data
         self.collect_data()
+        if timer is not None:
+            timer.lap('collect')
+        if self.recorder is not None:
+            self.recorder.record(self.current_step, self.population)
+            if timer is not None:
+                timer.lap('record')
+        if self.events.listeners['step_completed']:
+            self.events.emit('step_completed', self, self.current_step)
+        if timer is not None:
+            timer.lap('listeners')
+            timer.end_step(self.current_step)
+
+    def step_ai(self):
+        """
+        Evolves the GenerativeAI based on its usage and reports the change.
+        """
+        change = self.ai_agent.step(self)
+        if change is not None:
+            if self.log_enabled():
+                logger.info("AI %s! New knowledge contribution: %s", change,
+                            self.ai_agent.knowledge_contribution)
+            if self.events.listeners['ai_evolved']:
+                self.events.emit('ai_evolved', self, change, self.ai_agent.knowledge_contribution)
+
+    def step_agents(self, timer=None):
+        """
+        Steps every employee in turn through its EmployeeAgent view (the 'agent'
+        engine), charging each phase to timer when profiling.
+        """
+        for agent in self.population:
+            # Knowledge decay
+            agent.knowledge = max(0, agent.knowledge - self.knowledge_decay_rate)
+            if timer is not None:
+                timer.lap('decay')
+
+            # Interact with social network
+            social_neighbors = list(self.social_network.neighbors(agent.unique_id))
+            if social_neighbors:
+                partner_id = self.random.choice(social_neighbors)
+                partner = self.agent_at(partner_id)
+                agent.interact_with_agent(partner)
+            if timer is not None:
+                timer.lap('social')
+
+            # Interact with organizational network
+            if agent.unique_id in self.org_network:
+                org_neighbors = list(self.org_network.neighbors(agent.unique_id))
+                if org_neighbors:
+                    org_partner_id = self.random.choice(org_neighbors)
+                    if org_partner_id <= self.num_employees:  # Ensure within bounds
+                        org_partner = self.agent_at(org_partner_id)
+                        agent.interact_with_agent(org_partner)
+            if timer is not None:
+                timer.lap('org')
+
+            # Interact with Generative AI
+            agent.interact_with_ai(self.ai_agent)
+            if timer is not None:
+                timer.lap('ai_interaction')
+
+            # Update AI Attitude
+            agent.update_ai_attitude(self)
+            if timer is not None:
+                timer.lap('attitude')
 
     def modify_social_network(self):
         """
         Dynamically modifies the social network by adding/removing edges.
         """
-        print(f"Modifying social network at step {self.current_step}...")
         # Decide randomly to add or remove edges
-        action = random.choice(['add', 'remove'])
+        action = self.random.choice(['add', 'remove'])
         if action == 'add':
-            add_random_edges(self.social_network, self.num_edges_change)
-            print(f"Added {self.num_edges_change} random edges.")
+            num_changed = add_random_edges(self.social_network, self.num_edges_change,
+                                           seed=self.random, pool=self.social_edges)
         elif action == 'remove':
-            remove_random_edges(self.social_network, self.num_edges_change)
-            print(f"Removed {self.num_edges_change} random edges.")
+            num_changed = remove_random_edges(self.social_network, self.num_edges_change,
+                                              seed=self.random, pool=self.social_edges)
+        if self.log_enabled():
+            logger.info("Step %d: %s %d random edges %s the social network.", self.current_step,
+                        'added' if action == 'add' else 'removed', num_changed,
+                        'to' if action == 'add' else 'from')
+        if self.events.listeners['network_modified']:
+            self.events.emit('network_modified', self, action, num_changed)
+        self.metrics.network_changed()
+        if self.engine is not None:
+            self.engine.network_changed()
 
     def collect_data(self):
         """
@@ -276,36 +476,170 @@ class OrganizationModel:
         self.data["AI Knowledge Contribution"].append(ai_contribution)
         self.data["Network Centrality"].append(network_centrality)
 
-    def run_model(self, n_steps=100):
+    def add_listener(self, event, callback):
+        """
+        Registers a callback for a model event (see events.EventHooks).
+        """
+        self.events.add_listener(event, callback)
+
+    def log_enabled(self, level=logging.INFO):
+        """
+        Whether progress messages at level would be emitted.
+        """
+        return not self.quiet and logger.isEnabledFor(level)
+
+    def record_agents(self, stride=1, window=None, spill_path=None, spill_block=None):
+        """
+        Starts recording per-agent knowledge and attitude trajectories every
+        stride steps and returns the TrajectoryRecorder. With a window, only the
+        last window records are kept in memory and older ones are spilled to
+        memory-mapped files at spill_path (see recorder.py).
+        """
+        self.recorder = TrajectoryRecorder(self.num_employees, stride=stride, window=window,
+                                           spill_path=spill_path, spill_block=spill_block)
+        return self.recorder
+
+    def profile(self, enabled=True):
+        """
+        Starts (or with enabled=False stops) timing every phase of step and
+        returns the PhaseTimer. Per-step phase times are in self.profile_data;
+        disabled profiling costs one attribute check per phase.
+        """
+        self.profiler = PhaseTimer() if enabled else None
+        return self.profiler
+
+    @property
+    def profile_data(self):
         """
-        Runs the model for a specified number of steps and saves the results.
+        Seconds spent in each phase per step, keyed like self.data (None when
+        profiling is off).
         """
-        for i in range(n_steps):
-            self.step()
-            if (i+1) % 10 == 0:
-                print(f"Step {i+1} completed.")
+        return self.profiler.data if self.profiler is not None else None
 
-        # Save data to CSV
-        df = pd.DataFrame(self.data)
-        df.to_csv('data/results.csv', index=False)
-        print("Simulation completed. Results saved to 'data/results.csv'.")
+    def run_model(self, n_steps=100, output_path='data/results.csv', output_format=None,
+                  flush_every=100, keep_data=True, checkpoint_path=None, checkpoint_every=None,
+                  stop_when=None, append=False):
+        """
+        Runs the model for a specified number of steps and streams the results
+        to output_path while it runs.
 
-    def visualize_networks(self):
+        Parameters:
+            n_steps: Number of steps to run
+            output_path: Result file (None to keep results in self.data only)
+            output_format: 'csv', 'parquet', 'feather' or 'binary' (see sinks.py);
+                inferred from the file extension when None
+            flush_every: Steps between writes to the result file
+            keep_data: Keep all rows in self.data; when False, rows are dropped
+                once written so memory stays bounded on long runs
+            checkpoint_path: File to save the model state to (see checkpoint.py);
+                resume from it with checkpoint.resume
+            checkpoint_every: Steps between checkpoints (None saves only at the end)
+            stop_when: Stopping criterion or list of criteria (see stopping.py)
+                checked after every step; the run ends at the first one that
+                fires and its reason is kept in self.stop_reason
+            append: Continue the result file of the run this model was
+                checkpointed in (self.output) instead of overwriting it: the
+                file is cut back to what was written at the checkpoint and rows
+                of self.data already in it are not written again
+
+        Returns the number of steps run.
+        """
+        if checkpoint_every is not None and checkpoint_path is None:
+            raise ValueError("checkpoint_every needs a checkpoint_path.")
+        sink = None
+        flushed = 0
+        if output_path is not None:
+            output_format = result_format(output_path, output_format)
+            offset = None
+            if append:
+                if self.output is None or self.output["path"] != os.fspath(output_path):
+                    raise ValueError(f"No run of this model wrote to '{output_path}' to append to.")
+                offset, flushed = self.output["offset"], self.output["rows"]
+                if offset is None:
+                    raise ValueError(f"{output_format} results can't be appended to; use a new output_path.")
+            sink = open_sink(output_path, output_format, offset)
+        if self.recorder is not None:
+            self.recorder.reserve(n_steps)
+        criteria = as_criteria(stop_when)
+        for criterion in criteria:
+            criterion.reset(self)
+        self.stop_reason = None
+        steps_run = 0
+        try:
+            for i in range(n_steps):
+                self.step()
+                steps_run = i + 1
+                # Criteria read the latest row, so check before it can be flushed
+                for criterion in criteria:
+                    self.stop_reason = criterion.check(self)
+                    if self.stop_reason is not None:
+                        break
+                if (i+1) % 10 == 0 and self.log_enabled():
+                    logger.info("Step %d completed.", i+1)
+                if sink is not None and (i+1) % flush_every == 0:
+                    flushed = self.flush_output(sink, output_path, output_format, flushed, keep_data)
+                if checkpoint_every is not None and (i+1) % checkpoint_every == 0:
+                    # Rows up to here must be on disk before the state that follows them
+                    if sink is not None:
+                        flushed = self.flush_output(sink, output_path, output_format, flushed, keep_data)
+                    self.save_checkpoint(checkpoint_path)
+                if self.stop_reason is not None:
+                    if self.log_enabled():
+                        logger.info("Stopped at step %d: %s.", self.current_step, self.stop_reason)
+                    break
+        finally:
+            # Write whatever was collected, even if the run failed
+            if sink is not None:
+                self.flush_output(sink, output_path, output_format, flushed, keep_data)
+                sink.close()
+
+        if checkpoint_path is not None and (checkpoint_every is None or steps_run % checkpoint_every):
+            self.save_checkpoint(checkpoint_path)
+        if sink is not None and self.log_enabled():
+            logger.info("Simulation completed. Results saved to '%s'.", output_path)
+        if self.profiler is not None and self.log_enabled():
+            logger.info("Time per phase:\n%s", self.profiler.format_summary())
+        return steps_run
+
+    def flush_output(self, sink, output_path, output_format, start=0, keep_data=True):
         """
-        Visualizes the organizational and social interaction networks.
+        Flushes self.data to the run's sink (see flush_data) and records in
+        self.output how far the result file is written, which checkpoints
+        keep so a resumed run can append to it.
         """
-        # Organizational Network
-        plt.figure(figsize=(12, 8))
-        pos_org = nx.spring_layout(self.org_network.to_undirected(), seed=42)
-        nx.draw(self.org_network.to_undirected(), pos=pos_org, with_labels=True, node_size=300, 
-                node_color='lightblue', edge_color='gray', arrows=True)
-        plt.title("Organizational Network")
-        plt.show()
+        flushed = self.flush_data(sink, start, keep_data)
+        self.output = {"path": os.fspath(output_path), "format": output_format, "offset": sink.tell(),
+                       "rows": flushed}
+        return flushed
 
-        # Social Interaction Network
-        plt.figure(figsize=(12, 8))
-        pos_social = nx.spring_layout(self.social_network, seed=42)
-        nx.draw(self.social_network, pos=pos_social, with_labels=False, node_size=50, 
-                node_color='lightgreen', edge_color='gray')
-        plt.title("Social Interaction Network")
-        plt.show()
+    def flush_data(self, sink, start=0, keep_data=True):
+        """
+        Writes the rows of self.data from index start onwards to a result sink
+        and returns the index of the next unwritten row. Without keep_data the
+        written rows are removed from self.data.
+        """
+        columns = {name: values[start:] for name, values in self.data.items()}
+        if columns["Step"]:
+            sink.write(columns)
+        if keep_data:
+            return len(self.data["Step"])
+        for values in self.data.values():
+            values.clear()
+        return 0
+
+    def visualize_networks(self, **kwargs):
+        """
+        Visualizes the organizational and social interaction networks with
+        cached layouts (see plotting.visualize_networks for the options;
+        matplotlib is imported on first use).
+        """
+        from plotting import visualize_networks
+        visualize_networks(self, **kwargs)
+
+    def save_network_frames(self, output_dir, **kwargs):
+        """
+        Saves a network image every few steps while the model runs and
+        returns the plotting.NetworkFrames recorder (see there for options).
+        """
+        from plotting import NetworkFrames
+        return NetworkFrames(self, output_dir, **kwargs)
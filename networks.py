@@ -1,92 +1,355 @@
 # networks.py
 
 import random
+import numpy as np
 import networkx as nx
 
+def _as_random(seed):
+    """
+    Returns a random.Random for seed, which may be None, an int or a random.Random.
+    """
+    if isinstance(seed, random.Random):
+        return seed
+    return random.Random(seed)
+
+def _as_generator(seed):
+    """
+    Returns a NumPy Generator for seed, which may be None, an int, a
+    random.Random or a Generator.
+    """
+    if isinstance(seed, random.Random):
+        seed = seed.getrandbits(64)
+    return np.random.default_rng(seed)
+
+class OrgChart:
+    """
+    An organizational network held as NumPy arrays: the reporting tree as a
+    parent array over positions numbered in breadth-first order, plus extra
+    (lateral) edges. The networkx DiGraph is only built when graph is used.
+    """
+    def __init__(self, parent, level_bounds, lateral_sources=None, lateral_targets=None):
+        """
+        Parameters:
+            parent: Manager of every position (-1 for the top)
+            level_bounds: Positions of level l are level_bounds[l]:level_bounds[l + 1]
+            lateral_sources, lateral_targets: Extra edges beyond the tree
+        """
+        self.parent = parent
+        self.level_bounds = level_bounds
+        empty = np.empty(0, dtype=np.int64)
+        self.lateral_sources = empty if lateral_sources is None else lateral_sources
+        self.lateral_targets = empty if lateral_targets is None else lateral_targets
+        self._graph = None
+
+    @property
+    def num_nodes(self):
+        return len(self.parent)
+
+    def edges(self):
+        """
+        All edges as (sources, targets) arrays, level by level: the tree edges
+        into a level followed by the lateral edges out of it.
+        """
+        tree_targets = np.arange(1, self.num_nodes, dtype=np.int64)
+        sources = np.concatenate([self.parent[1:], self.lateral_sources])
+        targets = np.concatenate([tree_targets, self.lateral_targets])
+        # Tree edges sort by target position, lateral edges just after their source's level
+        lateral_rank = self.level_bounds[np.searchsorted(self.level_bounds, self.lateral_sources,
+                                                         side='right')] - 0.5
+        order = np.argsort(np.concatenate([tree_targets, lateral_rank]), kind='stable')
+        return sources[order], targets[order]
+
+    @property
+    def graph(self):
+        """
+        The chart as a networkx DiGraph, built on first use.
+        """
+        if self._graph is None:
+            G = nx.DiGraph()
+            G.add_nodes_from(range(self.num_nodes))
+            G.add_edges_from(zip(*(array.tolist() for array in self.edges())))
+            self._graph = G
+        return self._graph
+
+    def csr(self, num_rows=None):
+        """
+        Successor CSR adjacency (indptr, indices) for positions below num_rows,
+        in the same layout as to_csr, without building the DiGraph.
+        """
+        if num_rows is None:
+            num_rows = self.num_nodes
+        sources, targets = self.edges()
+        keep = sources < num_rows
+        sources, targets = sources[keep], targets[keep]
+        order = np.lexsort((targets, sources))
+        indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_rows), out=indptr[1:])
+        return indptr, targets[order]
+
+def org_size(num_levels, span_of_control):
+    """
+    Number of positions in a full org chart with num_levels levels, where
+    span_of_control is an int or a list of spans per level.
+    """
+    size, level_size = 1, 1
+    for level in range(num_levels - 1):
+        level_size *= _span_at(span_of_control, level)
+        size += level_size
+    return size
+
+def _span_at(span_of_control, level):
+    """
+    Span of control of managers at level, from an integer (Python or NumPy)
+    or a list or array of spans whose last entry repeats.
+    """
+    if np.ndim(span_of_control) == 0:
+        return int(span_of_control)
+    return int(span_of_control[min(level, len(span_of_control) - 1)])
+
+def build_org_chart(num_nodes, span_of_control, lateral_probability=0.0, seed=None):
+    """
+    Builds an org chart with exactly num_nodes positions in closed form.
+
+    Levels are filled top-down; managers at level l have span_of_control
+    reports (an int, or a list of spans per level whose last entry repeats).
+    Position j of level l reports to position j // span of level l - 1, so
+    a partial bottom level fills the first managers' teams. With a
+    lateral_probability, each position below the top also links to a random
+    position of the level above (the onion structure).
+    """
+    if num_nodes < 1:
+        raise ValueError("An org chart needs at least one position.")
+    parent = np.empty(num_nodes, dtype=np.int64)
+    parent[0] = -1
+    bounds = [0, 1]
+    level = 0
+    while bounds[-1] < num_nodes:
+        span = _span_at(span_of_control, level)
+        if span < 1:
+            raise ValueError("Span of control must be at least 1.")
+        previous_start, start = bounds[-2], bounds[-1]
+        end = min(num_nodes, start + (start - previous_start) * span)
+        parent[start:end] = previous_start + np.arange(end - start) // span
+        bounds.append(end)
+        level += 1
+    level_bounds = np.array(bounds, dtype=np.int64)
+
+    lateral_sources = lateral_targets = None
+    if lateral_probability > 0:
+        rng = _as_generator(seed)
+        nodes = np.arange(1, num_nodes, dtype=np.int64)
+        lateral_sources = nodes[rng.random(nodes.size) < lateral_probability]
+        node_level = np.searchsorted(level_bounds, lateral_sources, side='right') - 1
+        above_start, above_end = level_bounds[node_level - 1], level_bounds[node_level]
+        lateral_targets = above_start + (rng.random(lateral_sources.size)
+                                         * (above_end - above_start)).astype(np.int64)
+    return OrgChart(parent, level_bounds, lateral_sources, lateral_targets)
+
 def create_hierarchical_network(num_levels, span_of_control):
     """
     Creates a hierarchical (tree-like) organizational network.
     """
-    G = nx.DiGraph()
-    current_id = 0
-    G.add_node(current_id)
-    previous_level = [current_id]
-    current_id += 1
-
-    for level in range(1, num_levels):
-        current_level = []
-        for manager in previous_level:
-            for _ in range(span_of_control):
-                G.add_node(current_id)
-                G.add_edge(manager, current_id)
-                current_level.append(current_id)
-                current_id += 1
-        previous_level = current_level
+    return build_org_chart(org_size(num_levels, span_of_control), span_of_control).graph
 
-    return G
-
-def create_onion_network(num_levels, span_of_control):
+def create_onion_network(num_levels, span_of_control, seed=None):
     """
     Creates an onion-like hierarchical network with additional inter-layer connections.
+    seed (None, int, random.Random or NumPy Generator) drives the random lateral links.
     """
-    G = nx.DiGraph()
-    current_id = 0
-    G.add_node(current_id)
-    previous_level = [current_id]
-    current_id += 1
-
-    for level in range(1, num_levels):
-        current_level = []
-        for manager in previous_level:
-            for _ in range(span_of_control):
-                G.add_node(current_id)
-                G.add_edge(manager, current_id)
-                current_level.append(current_id)
-                current_id += 1
-        # Add inter-layer (lateral) connections
-        for node in current_level:
-            if random.random() < 0.3:  # 30% chance to connect laterally
-                lateral = random.choice(previous_level)
-                if lateral != node:
-                    G.add_edge(node, lateral)
-        previous_level = current_level
+    return build_org_chart(org_size(num_levels, span_of_control), span_of_control,
+                           lateral_probability=0.3, seed=seed).graph  # 30% chance to connect laterally
 
-    return G
-
-def create_small_world_network(num_nodes, k, p):
+def create_small_world_network(num_nodes, k, p, seed=None):
     """
     Creates a Small-World network for social interactions.
     """
-    return nx.watts_strogatz_graph(num_nodes, k, p)
+    return nx.watts_strogatz_graph(num_nodes, k, p, seed=seed)
 
-def create_scale_free_network(num_nodes, m):
+def create_scale_free_network(num_nodes, m, seed=None):
     """
     Creates a Scale-Free network for social interactions.
     """
-    return nx.barabasi_albert_graph(num_nodes, m)
+    return nx.barabasi_albert_graph(num_nodes, m, seed=seed)
+
+class EdgePool:
+    """
+    Keeps the node list and an indexed edge list of a network so that random
+    edges can be sampled and removed in O(1). Once a pool exists, change the
+    network's edges only through the pool (directly or by passing it to
+    add_random_edges/remove_random_edges) to keep the two in sync. nodes and
+    edges may be given to restore a pool's exact order (e.g. from a checkpoint).
+    While edge_log is a list, every edge added or removed is appended to it,
+    so callers can update copies of the adjacency for just those edges.
+    """
+    def __init__(self, G, nodes=None, edges=None):
+        self.G = G
+        self.nodes = list(G) if nodes is None else list(nodes)
+        self.edges = list(G.edges()) if edges is None else list(edges)
+        self.positions = {edge: i for i, edge in enumerate(self.edges)}
+        self.edge_log = None
+
+    def __len__(self):
+        return len(self.edges)
+
+    def add_edge(self, u, v):
+        """
+        Adds the edge (u, v) to the network and the pool.
+        """
+        self.G.add_edge(u, v)
+        self.positions[(u, v)] = len(self.edges)
+        self.edges.append((u, v))
+        if self.edge_log is not None:
+            self.edge_log.append((u, v))
+
+    def remove_edge(self, u, v):
+        """
+        Removes the edge (u, v) from the network and the pool by moving the
+        last pooled edge into its slot.
+        """
+        key = (u, v)
+        if key not in self.positions and not self.G.is_directed():
+            key = (v, u)
+        position = self.positions.pop(key)
+        last = self.edges.pop()
+        if position < len(self.edges):
+            self.edges[position] = last
+            self.positions[last] = position
+        self.G.remove_edge(u, v)
+        if self.edge_log is not None:
+            self.edge_log.append((u, v))
 
-def add_random_edges(G, num_edges):
+def add_random_edges(G, num_edges, seed=None, pool=None):
     """
     Dynamically adds random edges to a network.
+
+    Draws node pairs uniformly and rejects existing edges and self-loops, which
+    picks uniformly among the missing edges without listing them. Costs
+    O(num_edges) with a pool and O(N) without one (to list the nodes). Falls
+    back to enumerating the missing edges once the network is over half full.
+    Returns the number of edges added.
     """
-    possible_edges = list(nx.non_edges(G))
-    random.shuffle(possible_edges)
+    rng = _as_random(seed)
+    nodes = pool.nodes if pool is not None else list(G)
+    num_existing = len(pool) if pool is not None else G.number_of_edges()
+    num_nodes = len(nodes)
+    max_edges = num_nodes * (num_nodes - 1)
+    if not G.is_directed():
+        max_edges //= 2
+    num_missing = max_edges - num_existing
+    num_edges = max(0, min(num_edges, num_missing))
+    add_edge = pool.add_edge if pool is not None else G.add_edge
+
+    if 2 * num_missing < max_edges:
+        # Dense network: rejection sampling would mostly hit existing edges
+        possible_edges = [(u, v) for u, v in nx.non_edges(G) if u != v]
+        for edge in rng.sample(possible_edges, num_edges):
+            add_edge(*edge)
+        return num_edges
+
     added = 0
-    for edge in possible_edges:
-        if added >= num_edges:
-            break
-        G.add_edge(*edge)
-        added += 1
+    while added < num_edges:
+        u, v = rng.sample(nodes, 2)
+        if not G.has_edge(u, v):
+            add_edge(u, v)
+            added += 1
+    return added
 
-def remove_random_edges(G, num_edges):
+def remove_random_edges(G, num_edges, seed=None, pool=None):
     """
     Dynamically removes random edges from a network.
+
+    Picks edges uniformly without replacement. Costs O(num_edges) with a pool,
+    without one it lists the edges once but no longer shuffles them all.
+    Returns the number of edges removed.
     """
-    existing_edges = list(G.edges())
-    random.shuffle(existing_edges)
+    rng = _as_random(seed)
+    if pool is None:
+        existing_edges = list(G.edges())
+        chosen = rng.sample(existing_edges, min(num_edges, len(existing_edges)))
+        G.remove_edges_from(chosen)
+        return len(chosen)
+
     removed = 0
-    for edge in existing_edges:
-        if removed >= num_edges:
-            break
-        G.remove_edge(*edge)
+    while removed < num_edges and len(pool):
+        pool.remove_edge(*pool.edges[rng.randrange(len(pool))])
         removed += 1
+    return removed
+
+def to_csr(G, num_nodes=None, edges=None):
+    """
+    Converts a network into CSR adjacency arrays (indptr, indices).
+
+    Nodes must be integers. Only nodes below num_nodes get a row; their
+    neighbors are indices[indptr[i]:indptr[i + 1]] in ascending order and may
+    be any node id. Undirected edges appear in both rows, directed edges only
+    in the row of their source. edges may give G's edges in any order (e.g.
+    an EdgePool's list), which is much faster than iterating the graph.
+    """
+    if num_nodes is None:
+        num_nodes = G.number_of_nodes()
+    if edges is None:
+        edges = list(G.edges())
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    src, dst = edges[:, 0], edges[:, 1]
+    if not G.is_directed():
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+    keep = src < num_nodes
+    src, dst = src[keep], dst[keep]
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+    return indptr, dst[order]
+
+def replace_csr_rows(csr, rows, degrees, row_indices):
+    """
+    CSR adjacency (indptr, indices) with the rows rows (ascending) replaced:
+    their new degrees and their entries concatenated in row order
+    (row_indices). Costs one pass over the arrays instead of rebuilding them
+    from the network.
+    """
+    indptr, indices = csr
+    degree = np.diff(indptr)
+    new_degree = degree.copy()
+    new_degree[rows] = degrees
+    new_indptr = np.zeros_like(indptr)
+    np.cumsum(new_degree, out=new_indptr[1:])
+    kept = np.ones(len(degree), dtype=bool)
+    kept[rows] = False
+    new_indices = np.empty(new_indptr[-1], dtype=indices.dtype)
+    kept_entries = np.repeat(kept, new_degree)
+    new_indices[kept_entries] = indices[np.repeat(kept, degree)]
+    new_indices[~kept_entries] = row_indices
+    return new_indptr, new_indices
+
+def adjacency_arrays(G):
+    """
+    Exports an undirected network as (nodes, indptr, indices), keeping every
+    node's neighbors in the graph's own iteration order.
+    """
+    nodes = list(G)
+    adjacency = G.adj
+    degrees = [len(adjacency[node]) for node in nodes]
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter((neighbor for node in nodes for neighbor in adjacency[node]),
+                          dtype=np.int64, count=int(indptr[-1]))
+    return np.array(nodes, dtype=np.int64), indptr, indices
+
+def graph_from_adjacency(nodes, indptr, indices):
+    """
+    Rebuilds an undirected network from adjacency_arrays output with every
+    node's neighbors in the same order, so random choices over neighbor lists
+    replay identically. add_edge appends to both endpoints at once and cannot
+    reproduce arbitrary per-node orders, so the rows are filled directly.
+    """
+    G = nx.Graph()
+    nodes = nodes.tolist()
+    G.add_nodes_from(nodes)
+    adjacency = G._adj
+    indices = indices.tolist()
+    for node, start, end in zip(nodes, indptr[:-1].tolist(), indptr[1:].tolist()):
+        row = adjacency[node]
+        for neighbor in indices[start:end]:
+            edge_data = adjacency[neighbor].get(node)
+            row[neighbor] = edge_data if edge_data is not None else {}
+    return G
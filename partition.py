@@ -0,0 +1,352 @@
+# partition.py
+
+import multiprocessing
+import os
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from engine import average_proposals, sample_partners
+from kernels import Rules
+from networks import to_csr
+
+def partition_rows(work, num_shards):
+    """
+    Splits rows 0..len(work) into num_shards contiguous ranges of about equal
+    total work and returns their bounds (shard s owns bounds[s]:bounds[s + 1]).
+    Contiguous ranges keep neighbors together for both networks: the org chart
+    numbers positions level by level and the small-world lattice links nearby
+    ids, so most edges stay inside a shard.
+    """
+    num_shards = max(1, min(num_shards, len(work)))
+    cumulative = np.cumsum(work, dtype=np.float64)
+    targets = cumulative[-1] * np.arange(1, num_shards) / num_shards if len(work) else []
+    bounds = np.zeros(num_shards + 1, dtype=np.int64)
+    bounds[1:-1] = np.searchsorted(cumulative, targets, side='right')
+    bounds[-1] = len(work)
+    return np.maximum.accumulate(bounds)
+
+def shard_rows(csr, start, end):
+    """
+    The rows start:end of CSR adjacency, rebased so the shard's indptr starts at 0.
+    """
+    indptr, indices = csr
+    return indptr[start:end + 1] - indptr[start], indices[indptr[start]:indptr[end]]
+
+class SharedState:
+    """
+    The arrays all shards read and write, laid out in one shared memory
+    block: the knowledge of every employee (current and after the social
+    phase), the AI attitudes, and each shard's outbox of proposals for
+    employees of other shards. Every employee makes at most one remote
+    proposal per phase, so shard s's outbox is the slice bounds[s]:bounds[s + 1]
+    of outbox_targets and outbox_values, sorted by destination shard, with
+    outbox_offsets[s] marking where each destination's entries start.
+    """
+    def __init__(self, num_employees, num_shards, name=None):
+        self.layout = [("knowledge", np.float64, num_employees),
+                       ("social_knowledge", np.float64, num_employees),
+                       ("outbox_values", np.float64, num_employees),
+                       ("outbox_targets", np.int64, num_employees),
+                       ("outbox_offsets", np.int64, num_shards * (num_shards + 1)),
+                       ("ai_attitude", np.int8, num_employees)]
+        size = sum(np.dtype(dtype).itemsize * length for _, dtype, length in self.layout)
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        offset = 0
+        for array_name, dtype, length in self.layout:
+            setattr(self, array_name, np.ndarray(length, dtype=dtype, buffer=self.memory.buf, offset=offset))
+            offset += np.dtype(dtype).itemsize * length
+        self.outbox_offsets = self.outbox_offsets.reshape(num_shards, num_shards + 1)
+
+    def release(self):
+        """
+        Drops the array views and detaches from the block.
+        """
+        for array_name, _, _ in self.layout:
+            setattr(self, array_name, None)
+        self.memory.close()
+
+class Shard:
+    """
+    One worker's part of the organization: the employees bounds[index]:bounds[index + 1],
+    their rows of both networks, their expertise and behavior modifiers and
+    the model parameters its updates need. Rule kernels are looked up by
+    name in the worker, so custom kernels must be registered on import of a
+    module the worker also imports (or before the workers fork).
+    """
+    def __init__(self, index, bounds, social_rows, org_rows, expertise, behavior_modifier, params):
+        self.index = index
+        self.bounds = bounds
+        self.start, self.end = int(bounds[index]), int(bounds[index + 1])
+        self.social_rows = social_rows
+        self.org_rows = org_rows
+        self.expertise = expertise
+        self.behavior_modifier = behavior_modifier
+        self.decay = params['knowledge_decay_rate']
+        self.positive_threshold = params['attitude_positive_threshold']
+        self.negative_threshold = params['attitude_negative_threshold']
+        self.num_employees = params['num_employees']
+        self.rule_names = params.get('rules')
+        self.rules = None
+
+    def step(self, state, barrier, contribution, seed):
+        """
+        Runs one synchronous step for the shard's employees, exchanging
+        proposals with the other shards through state.
+        """
+        rng = np.random.default_rng([seed, self.index])
+        social = sample_partners(rng, *self.social_rows, self.num_employees)
+        org = sample_partners(rng, *self.org_rows, self.num_employees)
+        start, end = self.start, self.end
+
+        knowledge = np.maximum(state.knowledge[start:end] - self.decay, 0.0)
+        knowledge = self.interact(state, barrier, knowledge, social, state.knowledge, self.decay)
+        state.social_knowledge[start:end] = knowledge
+        # Every shard's social phase must be visible before partners are read again
+        barrier.wait()
+        knowledge = self.interact(state, barrier, knowledge, org, state.social_knowledge, 0.0)
+
+        attitude = state.ai_attitude[start:end]
+        knowledge += self.rules.ai_uplift(attitude, contribution)
+        attitude[:] = self.rules.attitude(attitude, knowledge - self.expertise, self.positive_threshold,
+                                          self.negative_threshold)
+        state.knowledge[start:end] = knowledge
+        return end - start
+
+    def interact(self, state, barrier, knowledge, partners, source, decay):
+        """
+        One phase of pairwise interactions as in engine.interact.
+        Partners' values are read from source, the shared array of all
+        employees (less decay, for the first phase); partners in other shards
+        get the actor's knowledge through the outboxes, and each employee ends up with the mean of all
+        proposals it received.
+        """
+        start, end = self.start, self.end
+        interaction = self.rules.interaction
+        actors = np.flatnonzero(partners >= 0)
+        targets = partners[actors]
+        actor_knowledge = knowledge[actors]
+        target_knowledge = np.maximum(source[targets] - decay, 0.0)
+
+        # Post the actors' knowledge for remote partners, grouped by their shard
+        remote = (targets < start) | (targets >= end)
+        remote_targets, remote_values = targets[remote], actor_knowledge[remote]
+        owners = np.searchsorted(self.bounds, remote_targets, side='right') - 1
+        order = np.argsort(owners, kind='stable')
+        num_remote = len(order)
+        state.outbox_targets[start:start + num_remote] = remote_targets[order]
+        state.outbox_values[start:start + num_remote] = remote_values[order]
+        offsets = state.outbox_offsets[self.index]
+        offsets[0] = 0
+        np.cumsum(np.bincount(owners, minlength=len(self.bounds) - 1), out=offsets[1:])
+        barrier.wait()
+
+        # Collect what other shards posted for this shard's employees
+        incoming_targets, incoming_values = [], []
+        for shard in range(len(self.bounds) - 1):
+            if shard != self.index:
+                outbox = int(self.bounds[shard])
+                first, last = state.outbox_offsets[shard, self.index:self.index + 2]
+                incoming_targets.append(state.outbox_targets[outbox + first:outbox + last] - start)
+                incoming_values.append(state.outbox_values[outbox + first:outbox + last])
+
+        local = ~remote
+        partners_of = np.concatenate([targets[local] - start] + incoming_targets)
+        partner_values = np.concatenate([actor_knowledge[local]] + incoming_values)
+        participants = np.concatenate([actors, partners_of])
+        proposals = np.concatenate([
+            interaction(actor_knowledge, target_knowledge, self.behavior_modifier[actors]),
+            interaction(knowledge[partners_of], partner_values, self.behavior_modifier[partners_of])])
+        return average_proposals(knowledge, participants, proposals)
+
+def run_shard(shard, state_name, num_employees, num_shards, barrier, connection):
+    """
+    Worker process loop: attaches to the shared state and runs one step per
+    ('step', contribution, seed, social_rows) message, replying with the
+    shard's AI usage (or the exception that stopped it), until it gets None.
+    """
+    state = SharedState(num_employees, num_shards, name=state_name)
+    shard.rules = Rules(shard.rule_names)
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            _, contribution, seed, social_rows = message
+            if social_rows is not None:
+                shard.social_rows = social_rows
+            try:
+                connection.send(shard.step(state, barrier, contribution, seed))
+            except Exception as error:
+                # Release the other shards waiting at the barrier
+                barrier.abort()
+                connection.send(error)
+                break
+    finally:
+        state.release()
+        connection.close()
+
+def _shutdown(processes, connections, memory):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+    for connection in connections:
+        connection.close()
+    try:
+        memory.close()
+    except BufferError:
+        # Views of the block are still alive; the mapping goes with the process
+        pass
+    memory.unlink()
+
+class PartitionedEngine:
+    """
+    Sharded implementation of OrganizationModel.step (the 'partitioned'
+    engine) for organizations whose per-step work is too much for one process.
+
+    The employees are split into num_shards contiguous ranges of about equal
+    work (partition_rows) and every shard runs in its own worker process with
+    only its rows of the social and org networks. Each step follows the
+    synchronous update mode of engine.ArrayEngine: every worker draws its
+    employees' partners, reads the partners' knowledge from the shared
+    arrays and, after each interaction phase, posts the averages for
+    partners in other shards to its outbox in shared memory; barriers
+    between the phases make the exchange consistent.
+    The AI usage counted by the shards is summed in the parent before
+    GenerativeAI.step runs there, as do network changes and data collection.
+
+    The population's knowledge and attitude arrays live in the shared block,
+    so everything in the model that reads them keeps working. Partner draws
+    use a fresh generator per shard and step seeded from model.rng, so
+    results depend on the seed and num_shards but not on timing, and
+    checkpoints resume bit-identically.
+
+    This is single-host shared-memory parallelism, not a distributed engine:
+    every worker can read the knowledge of all employees, and the parent
+    still builds the full networks and population, so it splits the work of
+    a step but not the memory. Call close() (or let the model be collected)
+    to stop the workers.
+    """
+    schedules_model_events = False
+
+    def __init__(self, model, num_shards=None):
+        """
+        Parameters:
+            model: OrganizationModel whose population and networks are stepped
+            num_shards: Number of worker processes (None for the number of cores)
+        """
+        self.model = model
+        self.num_employees = model.num_employees
+        if num_shards is None:
+            num_shards = os.cpu_count() or 1
+        social_csr = to_csr(model.social_network, self.num_employees, model.social_edges.edges)
+        org_csr = model.org_chart.csr(self.num_employees)
+        work = 1 + np.diff(social_csr[0]) + np.diff(org_csr[0])
+        self.start(partition_rows(work, num_shards), social_csr, org_csr)
+
+    def start(self, bounds, social_csr, org_csr):
+        """
+        Starts one worker per shard of bounds.
+        """
+        model = self.model
+        population = model.population
+        self.bounds = bounds
+        self.num_shards = len(bounds) - 1
+
+        # Move the population's changing arrays into the shared block
+        self.state = SharedState(self.num_employees, self.num_shards)
+        self.state.knowledge[:] = population.knowledge
+        self.state.ai_attitude[:] = population.ai_attitude
+        population.knowledge = self.state.knowledge
+        population.ai_attitude = self.state.ai_attitude
+
+        context = multiprocessing.get_context()
+        barrier = context.Barrier(self.num_shards)
+        behavior_modifier = population.behavior_modifier
+        self.connections, self.processes = [], []
+        for index in range(self.num_shards):
+            start, end = self.bounds[index], self.bounds[index + 1]
+            shard = Shard(index, self.bounds, shard_rows(social_csr, start, end),
+                          shard_rows(org_csr, start, end), population.expertise[start:end].copy(),
+                          behavior_modifier[start:end], model.params)
+            parent_end, worker_end = context.Pipe()
+            process = context.Process(target=run_shard, daemon=True,
+                                      args=(shard, self.state.memory.name, self.num_employees,
+                                            self.num_shards, barrier, worker_end))
+            process.start()
+            worker_end.close()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        self._pending_rows = None
+        self._finalizer = weakref.finalize(self, _shutdown, self.processes, self.connections,
+                                           self.state.memory)
+
+    def get_state(self):
+        """
+        The shard bounds, which depend on the network the engine started with.
+        """
+        return {"bounds": self.bounds}
+
+    def set_state(self, state):
+        """
+        Restarts the workers on the saved shard bounds.
+        """
+        if np.array_equal(state["bounds"], self.bounds):
+            return
+        self.close()
+        self.start(state["bounds"], to_csr(self.model.social_network, self.num_employees,
+                                           self.model.social_edges.edges),
+                   self.model.org_chart.csr(self.num_employees))
+
+    def network_changed(self):
+        """
+        Sends the shards their new social rows with the next step.
+        """
+        social_csr = to_csr(self.model.social_network, self.num_employees, self.model.social_edges.edges)
+        self._pending_rows = [shard_rows(social_csr, self.bounds[s], self.bounds[s + 1])
+                              for s in range(self.num_shards)]
+
+    def step(self, timer=None):
+        """
+        Advances all employees by one step across the shards and adds their
+        AI usage to the model's GenerativeAI.
+        """
+        if not self._finalizer.alive:
+            raise RuntimeError("The partitioned engine is closed.")
+        contribution = self.model.ai_agent.knowledge_contribution
+        seed = int(self.model.rng.integers(2 ** 63))
+        pending = self._pending_rows
+        self._pending_rows = None
+        for s, connection in enumerate(self.connections):
+            connection.send(('step', contribution, seed, None if pending is None else pending[s]))
+        replies = [connection.recv() for connection in self.connections]
+        for s, reply in enumerate(replies):
+            if isinstance(reply, Exception):
+                self.close()
+                raise RuntimeError(f"Shard {s} failed.") from reply
+        # Reduce the shards' AI usage before GenerativeAI.step
+        self.model.ai_agent.usage_count += sum(replies)
+        if timer is not None:
+            timer.lap('agents')
+
+    def close(self):
+        """
+        Stops the workers and frees the shared block; the population keeps
+        private copies of its arrays.
+        """
+        if not self._finalizer.alive:
+            return
+        population = self.model.population
+        population.knowledge = population.knowledge.copy()
+        population.ai_attitude = population.ai_attitude.copy()
+        self.state.knowledge = self.state.ai_attitude = None
+        self.state.release()
+        self._finalizer()
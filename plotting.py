@@ -0,0 +1,413 @@
+# plotting.py
+
+import hashlib
+import os
+import numpy as np
+import networkx as nx
+import matplotlib.pyplot as plt
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+from sinks import read_results
+
+# Layouts above this many nodes fall back from spring to circular
+SPRING_LAYOUT_MAX_NODES = 2000
+# Edge counts above which edges are rasterized instead of drawn as lines
+RASTER_MIN_EDGES = 200000
+ATTITUDE_COLORS = ('tab:red', 'gold', 'tab:green')
+
+def graph_fingerprint(G):
+    """
+    Hash of a network's nodes and edges (independent of insertion order),
+    used as the key of cached layouts.
+    """
+    edges = np.array(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+    if not G.is_directed():
+        edges = np.sort(edges, axis=1)
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+    digest = hashlib.sha1(np.array(sorted(G), dtype=np.int64).tobytes())
+    digest.update(edges.tobytes())
+    digest.update(b'directed' if G.is_directed() else b'undirected')
+    return digest.hexdigest()
+
+def circular_layout(num_nodes):
+    angles = 2 * np.pi * np.arange(num_nodes) / max(num_nodes, 1)
+    return np.column_stack([np.cos(angles), np.sin(angles)])
+
+def tree_layout(hierarchy):
+    """
+    Positions for an org chart from its HierarchyIndex in O(N): every
+    position is centered over its subtree's range in depth-first order, one
+    row per level, top of the hierarchy at the top.
+    """
+    x = (hierarchy.start + hierarchy.end - 1) / 2 / max(hierarchy.size - 1, 1)
+    return np.column_stack([x, -hierarchy.level.astype(np.float64)])
+
+def cached_layout(G, cache_dir='data/layouts', layout='auto', seed=42):
+    """
+    Node positions of G as an array indexed by node id, computed once and
+    cached in cache_dir under the graph's fingerprint (cache_dir=None keeps
+    nothing on disk).
+
+    layout: 'spring', 'circular' or 'auto' (spring up to
+        SPRING_LAYOUT_MAX_NODES nodes, circular beyond)
+    """
+    if layout == 'auto':
+        layout = 'spring' if G.number_of_nodes() <= SPRING_LAYOUT_MAX_NODES else 'circular'
+    if layout not in ('spring', 'circular'):
+        raise ValueError("Unsupported layout.")
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"{graph_fingerprint(G)}-{layout}-{seed}.npy")
+        if os.path.exists(path):
+            return np.load(path)
+
+    num_nodes = max(G, default=-1) + 1
+    if layout == 'spring':
+        positions = np.zeros((num_nodes, 2))
+        for node, position in nx.spring_layout(G, seed=seed).items():
+            positions[node] = position
+    else:
+        positions = circular_layout(num_nodes)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(path, positions)
+    return positions
+
+def rasterize_edges(positions, sources, targets, resolution=1000, samples=16, chunk=1000000):
+    """
+    Renders edges into a (resolution, resolution) count image by sampling
+    points along every edge, datashader-style. Returns (image, extent).
+    """
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    image = np.zeros((resolution, resolution))
+    steps = np.linspace(0.0, 1.0, samples)[:, None, None]
+    for begin in range(0, len(sources), chunk):
+        start = positions[sources[begin:begin + chunk]]
+        end = positions[targets[begin:begin + chunk]]
+        points = ((start + steps * (end - start)).reshape(-1, 2) - low) / span
+        cells = np.minimum((points * resolution).astype(np.int64), resolution - 1)
+        np.add.at(image, (cells[:, 1], cells[:, 0]), 1)
+    extent = (low[0], low[0] + span[0], low[1], low[1] + span[1])
+    return image, extent
+
+def draw_edges(ax, positions, sources, targets, render='auto', color='gray', resolution=1000):
+    """
+    Draws edges as one LineCollection, or as a rasterized density image for
+    large graphs (render 'lines', 'raster' or 'auto').
+    """
+    if render == 'auto':
+        render = 'lines' if len(sources) <= RASTER_MIN_EDGES else 'raster'
+    if render == 'lines':
+        segments = np.stack([positions[sources], positions[targets]], axis=1)
+        edges = LineCollection(segments, colors=color, linewidths=0.5, alpha=0.5, zorder=1)
+        ax.add_collection(edges)
+        return edges
+    if render == 'raster':
+        image, extent = rasterize_edges(positions, sources, targets, resolution)
+        return ax.imshow(np.log1p(image), extent=extent, origin='lower', cmap='Greys',
+                         aspect='auto', zorder=1)
+    raise ValueError("Unsupported render mode.")
+
+def node_values(model, num_nodes, color_by):
+    """
+    Per-node color values: knowledge or attitude code for employees, NaN for
+    the AI node and org positions without an employee.
+    """
+    values = np.full(num_nodes, np.nan)
+    size = min(num_nodes, model.num_employees)
+    if color_by == 'knowledge':
+        values[:size] = model.population.knowledge[:size]
+    elif color_by == 'attitude':
+        values[:size] = model.population.ai_attitude[:size]
+    else:
+        raise ValueError("Unsupported node coloring.")
+    return values
+
+def draw_nodes(ax, positions, values=None, color_by='knowledge', node_size=None, color='lightblue'):
+    """
+    Draws nodes as one scatter; with values they are colored by knowledge
+    (viridis) or attitude (red/yellow/green), NaN values in light gray.
+    """
+    if node_size is None:
+        node_size = max(1.0, min(50.0, 20000 / len(positions)))
+    if values is None:
+        return ax.scatter(positions[:, 0], positions[:, 1], s=node_size, c=color, zorder=2,
+                          rasterized=len(positions) > 10000)
+    if color_by == 'attitude':
+        cmap, vmin, vmax = ListedColormap(ATTITUDE_COLORS), -0.5, 2.5
+    else:
+        cmap, vmin, vmax = colormaps['viridis'], None, None
+    cmap = cmap.with_extremes(bad='lightgray')
+    return ax.scatter(positions[:, 0], positions[:, 1], s=node_size, c=values, cmap=cmap,
+                      vmin=vmin, vmax=vmax, plotnonfinite=True, zorder=2,
+                      rasterized=len(positions) > 10000)
+
+def social_edge_arrays(model):
+    """
+    Current social network edges as (sources, targets), read from the edge pool.
+    """
+    edges = np.array(model.social_edges.edges, dtype=np.int64).reshape(-1, 2)
+    return edges[:, 0], edges[:, 1]
+
+def network_arrays(model, network, cache_dir='data/layouts'):
+    """
+    (positions, sources, targets) of the model's 'org' or 'social' network;
+    the org chart uses its tree layout, the social network a cached layout.
+    """
+    if network == 'org':
+        sources, targets = model.org_chart.edges()
+        return tree_layout(model.hierarchy), sources, targets
+    if network == 'social':
+        return (cached_layout(model.social_network, cache_dir), *social_edge_arrays(model))
+    raise ValueError("Unsupported network.")
+
+def visualize_networks(model, cache_dir='data/layouts', color_by=None, render='auto', show=True,
+                       output_dir=None):
+    """
+    Visualizes the organizational network as a tree and the social
+    interaction network with a cached layout, so repeated calls don't
+    recompute layouts and large graphs stay fast to draw.
+
+    Parameters:
+        model: OrganizationModel to draw
+        cache_dir: Directory for cached layouts (None to keep nothing on disk)
+        color_by: None, 'knowledge' or 'attitude' node colors
+        render: 'lines', 'raster' or 'auto' edge rendering (see draw_edges)
+        show: Show the figures (with pyplot)
+        output_dir: Also save the figures there as PNG files
+    """
+    for network, title in (('org', "Organizational Network"), ('social', "Social Interaction Network")):
+        positions, sources, targets = network_arrays(model, network, cache_dir)
+        fig, ax = plt.subplots(figsize=(12, 8))
+        draw_edges(ax, positions, sources, targets, render)
+        values = node_values(model, len(positions), color_by) if color_by else None
+        draw_nodes(ax, positions, values, color_by,
+                   color='lightblue' if network == 'org' else 'lightgreen')
+        ax.set_title(title)
+        ax.set_axis_off()
+        ax.autoscale_view()
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            fig.savefig(os.path.join(output_dir, f"{network}_network.png"), dpi=100)
+        if show:
+            plt.show()
+        plt.close(fig)
+
+class NetworkFrames:
+    """
+    Saves a PNG frame of a network every few steps while the model runs,
+    with nodes colored by knowledge or attitude. The layout and figure are
+    built once; each frame only updates node colors (and the edges after the
+    social network changed) and renders headless through the Agg backend.
+
+        frames = NetworkFrames(model, 'data/frames', color_by='attitude', every=10)
+        model.run_model(100)
+        frames.close()
+    """
+    def __init__(self, model, output_dir, network='social', color_by='knowledge', every=1,
+                 cache_dir='data/layouts', render='auto', dpi=100):
+        self.model = model
+        self.output_dir = output_dir
+        self.network = network
+        self.color_by = color_by
+        self.every = every
+        self.render = render
+        self.dpi = dpi
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.positions, sources, targets = network_arrays(model, network, cache_dir)
+        self.figure = Figure(figsize=(10, 8))
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_axis_off()
+        self.edges = draw_edges(self.ax, self.positions, sources, targets, render)
+        self.nodes = draw_nodes(self.ax, self.positions, node_values(model, len(self.positions), color_by),
+                                color_by)
+        self.ax.autoscale_view()
+        self.edges_changed = False
+
+        model.add_listener('step_completed', self.on_step)
+        if network == 'social':
+            model.add_listener('network_modified', self.on_network_modified)
+
+    def on_network_modified(self, model, action, num_edges):
+        self.edges_changed = True
+
+    def on_step(self, model, step):
+        if step % self.every == 0:
+            self.save_frame(step)
+
+    def save_frame(self, step):
+        """
+        Renders the current state to output_dir/<network>_<step>.png.
+        """
+        if self.edges_changed:
+            self.edges.remove()
+            sources, targets = social_edge_arrays(self.model)
+            self.edges = draw_edges(self.ax, self.positions, sources, targets, self.render)
+            self.edges_changed = False
+        values = node_values(self.model, len(self.positions), self.color_by)
+        self.nodes.set_array(values)
+        if self.color_by == 'knowledge' and np.isfinite(values).any():
+            self.nodes.set_clim(np.nanmin(values), np.nanmax(values))
+        self.ax.set_title(f"Step {step}")
+        self.figure.savefig(os.path.join(self.output_dir, f"{self.network}_{step:06d}.png"), dpi=self.dpi)
+
+    def close(self):
+        """
+        Stops saving frames.
+        """
+        self.model.events.remove_listener('step_completed', self.on_step)
+        if self.network == 'social':
+            self.model.events.remove_listener('network_modified', self.on_network_modified)
+
+def plot_metrics(data_path='data/results.csv', output_dir='data'):
+    """
+    Plots various metrics from the simulation data. data_path may be any
+    result file written by run_model (CSV, Parquet, Feather or binary).
+    Plots are saved as PNG files in output_dir.
+    """
+    if not os.path.exists(data_path):
+        print(f"Data file '{data_path}' not found.")
+        return
+    os.makedirs(output_dir, exist_ok=True)
+
+    data = read_results(data_path)
+
+    # Plot Average Knowledge Over Time
+    plt.figure(figsize=(12, 6))
+    plt.plot(data["Step"], data["Average Knowledge"], label="Average Knowledge", color='blue')
+    plt.xlabel("Time Steps")
+    plt.ylabel("Average Knowledge")
+    plt.title("Average Knowledge Over Time")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'average_knowledge_over_time.png'))
+    plt.show()
+
+    # Plot AI Utilization Over Time
+    plt.figure(figsize=(12, 6))
+    plt.plot(data["Step"], data["Positive Attitudes"], label="Positive Attitudes", color='green')
+    plt.plot(data["Step"], data["Neutral Attitudes"], label="Neutral Attitudes", color='orange')
+    plt.plot(data["Step"], data["Negative Attitudes"], label="Negative Attitudes", color='red')
+    plt.xlabel("Time Steps")
+    plt.ylabel("Number of Agents")
+    plt.title("AI Utilization Over Time")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'ai_utilization_over_time.png'))
+    plt.show()
+
+    # Plot AI Knowledge Contribution Over Time
+    plt.figure(figsize=(12, 6))
+    plt.plot(data["Step"], data["AI Knowledge Contribution"], label="AI Knowledge Contribution", color='purple')
+    plt.xlabel("Time Steps")
+    plt.ylabel("AI Knowledge Contribution")
+    plt.title("AI Knowledge Contribution Over Time")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'ai_contribution_over_time.png'))
+    plt.show()
+
+    # Plot Network Centrality Over Time
+    plt.figure(figsize=(12, 6))
+    plt.plot(data["Step"], data["Network Centrality"], label="Average Network Centrality", color='brown')
+    plt.xlabel("Time Steps")
+    plt.ylabel("Average Degree Centrality")
+    plt.title("Average Network Centrality Over Time")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'network_centrality_over_time.png'))
+    plt.show()
+
+    # Advanced Analysis: Correlation between AI Knowledge Contribution and Average Knowledge
+    plt.figure(figsize=(12, 6))
+    plt.scatter(data["AI Knowledge Contribution"], data["Average Knowledge"], color='teal')
+    plt.xlabel("AI Knowledge Contribution")
+    plt.ylabel("Average Knowledge")
+    plt.title("Correlation between AI Contribution and Average Knowledge")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'correlation_ai_knowledge_average_knowledge.png'))
+    plt.show()
+
+    correlation = data["AI Knowledge Contribution"].corr(data["Average Knowledge"])
+    print(f"Correlation between AI Knowledge Contribution and Average Knowledge: {correlation:.2f}")
+
+    # Additional Plots can be added as needed
+
+def _band_panel(summary, names, colors, ylabel, title):
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    columns = summary["columns"]
+    for name, color in zip(names, colors):
+        column = columns.index(name)
+        ax.plot(summary["steps"], summary["mean"][:, column], label=name, color=color)
+        ax.fill_between(summary["steps"], summary["ci_low"][:, column], summary["ci_high"][:, column],
+                        color=color, alpha=0.25, linewidth=0)
+    ax.set_xlabel("Time Steps")
+    ax.set_ylabel(ylabel)
+    ax.set_title(f"{title} ({summary['num_runs']} runs)")
+    ax.legend()
+    ax.grid(True)
+    figure.tight_layout()
+    return figure
+
+def _correlation_panel(summary, reference="AI Knowledge Contribution"):
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    columns = summary["columns"]
+    row = columns.index(reference)
+    others = [c for c in range(len(columns)) if c != row]
+    means = summary["corr_mean"][row, others]
+    errors = np.abs(np.stack([summary["corr_low"][row, others], summary["corr_high"][row, others]]) - means)
+    ax.bar(range(len(others)), means, yerr=np.nan_to_num(errors), color='teal', capsize=4)
+    ax.set_xticks(range(len(others)))
+    ax.set_xticklabels([columns[c] for c in others], rotation=15)
+    ax.set_ylim(-1, 1)
+    ax.axhline(0, color='gray', linewidth=0.8)
+    ax.set_ylabel("Mean within-run correlation")
+    ax.set_title(f"Correlation with {reference} across runs (with confidence intervals)")
+    ax.grid(True, axis='y')
+    figure.tight_layout()
+    return figure
+
+def plot_aggregate(summary, output_dir='data', dpi=100):
+    """
+    Renders the panels of an aggregated ensemble (analysis.RunAggregator.summary)
+    to PNG files in output_dir: per-step means with confidence bands and the
+    cross-run correlation summary. Figures are drawn headless on the Agg
+    backend, so nothing blocks. Returns the written paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    panels = {
+        'average_knowledge_over_time.png': _band_panel(
+            summary, ["Average Knowledge"], ['blue'], "Average Knowledge", "Average Knowledge Over Time"),
+        'ai_utilization_over_time.png': _band_panel(
+            summary, ["Positive Attitudes", "Neutral Attitudes", "Negative Attitudes"],
+            ['green', 'orange', 'red'], "Number of Agents", "AI Utilization Over Time"),
+        'ai_contribution_over_time.png': _band_panel(
+            summary, ["AI Knowledge Contribution"], ['purple'], "AI Knowledge Contribution",
+            "AI Knowledge Contribution Over Time"),
+        'network_centrality_over_time.png': _band_panel(
+            summary, ["Network Centrality"], ['brown'], "Average Degree Centrality",
+            "Average Network Centrality Over Time"),
+        'correlation_summary.png': _correlation_panel(summary),
+    }
+    paths = []
+    for name, figure in panels.items():
+        path = os.path.join(output_dir, name)
+        figure.savefig(path, dpi=dpi)
+        paths.append(path)
+    return paths
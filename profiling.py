@@ -0,0 +1,144 @@
+# profiling.py
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+class PhaseTimer:
+    """
+    Accumulates wall time and call counts per phase of OrganizationModel.step.
+
+    The model calls start() at the beginning of a step and lap(phase) at the
+    end of each phase, so every lap is charged the time since the previous
+    one. The phases are:
+        'decay', 'social', 'org', 'ai_interaction', 'attitude': Employee
+            updates (per agent with the agent engine, per batch with the
+            synchronous array engine)
+        'agents': The fused per-agent loop of the sequential array engine,
+            which interleaves decay, interactions and attitude updates
+            ('social' and 'org' then only cover partner sampling), and the
+            sharded step of the partitioned engine
+        'events': Agent actions of the event engine (decay catch-up,
+            interactions and attitude update of one employee at a time)
+        'metrics': Folding bulk agent updates into the tracked metrics
+        'ai_step': GenerativeAI.step
+        'network': modify_social_network
+        'collect': collect_data
+        'record': The per-agent trajectory recorder
+        'listeners': Event callbacks
+
+    data holds one row per step with the seconds spent in each phase, in the
+    same column layout as OrganizationModel.data.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.totals = {}
+        self.counts = {}
+        self.data = {"Step": []}
+        self._step_times = {}
+        self._last = clock()
+
+    def start(self):
+        self._last = self.clock()
+
+    def lap(self, phase):
+        now = self.clock()
+        self._step_times[phase] = self._step_times.get(phase, 0.0) + now - self._last
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+        self._last = now
+
+    def end_step(self, step):
+        """
+        Closes the current step and appends its phase times to data.
+        """
+        num_rows = len(self.data["Step"])
+        for phase in self._step_times:
+            if phase not in self.data:
+                # Phases seen for the first time get zeros for earlier steps
+                self.data[phase] = [0.0] * num_rows
+                self.totals[phase] = 0.0
+        self.data["Step"].append(step)
+        for phase, column in self.data.items():
+            if phase != "Step":
+                elapsed = self._step_times.get(phase, 0.0)
+                column.append(elapsed)
+                self.totals[phase] += elapsed
+        self._step_times.clear()
+
+    def summary(self):
+        """
+        Returns {phase: (total seconds, calls, share of the profiled time)},
+        slowest phase first.
+        """
+        total = sum(self.totals.values()) or 1.0
+        return {phase: (seconds, self.counts[phase], seconds / total)
+                for phase, seconds in sorted(self.totals.items(), key=lambda item: -item[1])}
+
+    def format_summary(self):
+        lines = [f"{'phase':<16}{'seconds':>12}{'calls':>12}{'share':>8}"]
+        for phase, (seconds, calls, share) in self.summary().items():
+            lines.append(f"{phase:<16}{seconds:>12.4f}{calls:>12}{share:>8.1%}")
+        return "\n".join(lines)
+
+@contextmanager
+def profile_run(output_path=None, profiler='cprofile', sort='cumulative', limit=30, interval=0.001):
+    """
+    Runs the enclosed block under a function-level profiler and yields it.
+
+        with profile_run('data/run.prof'):
+            model.run_model(1000)
+
+    Parameters:
+        output_path: Report file (cProfile stats for pstats/snakeviz, or an
+            HTML report for pyinstrument); when None the report is logged
+        profiler: 'cprofile' (deterministic, standard library) or
+            'pyinstrument' (sampling, much lower overhead; requires pyinstrument)
+        sort, limit: Sort key and number of functions in a logged cProfile report
+        interval: Sampling interval in seconds for pyinstrument
+    """
+    if profiler == 'cprofile':
+        active = cProfile.Profile()
+    elif profiler == 'pyinstrument':
+        try:
+            import pyinstrument
+        except ImportError:
+            raise ImportError("pyinstrument is required for sampling profiles.")
+        active = pyinstrument.Profiler(interval=interval)
+    else:
+        raise ValueError("Unsupported profiler.")
+
+    if output_path is not None:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    if profiler == 'cprofile':
+        active.enable()
+    else:
+        active.start()
+    try:
+        yield active
+    finally:
+        if profiler == 'cprofile':
+            active.disable()
+            if output_path is not None:
+                active.dump_stats(output_path)
+            else:
+                report = io.StringIO()
+                pstats.Stats(active, stream=report).sort_stats(sort).print_stats(limit)
+                logger.info(report.getvalue())
+        else:
+            active.stop()
+            if output_path is not None:
+                with open(output_path, 'w') as report_file:
+                    report_file.write(active.output_html())
+            else:
+                logger.info(active.output_text())
@@ -0,0 +1,135 @@
+# recorder.py
+
+import os
+import numpy as np
+
+class TrajectoryRecorder:
+    """
+    Records every employee's knowledge (float32) and AI attitude code (int8)
+    every stride steps into preallocated arrays of shape (records, agents).
+
+    Without a window all records are kept; capacity rows are allocated up
+    front and doubled if exceeded (run_model reserves enough for its steps).
+    With a window only the last window records stay in memory in a ring
+    buffer. Older records are spilled in blocks to memory-mapped files next to
+    spill_path (or dropped when spill_path is None), so memory use does not
+    grow with the length of the run.
+    """
+    def __init__(self, num_agents, stride=1, capacity=1024, window=None, spill_path=None,
+                 spill_block=None):
+        """
+        Parameters:
+            num_agents: Number of employees per record
+            stride: Record every stride-th step
+            capacity: Initially allocated records (without a window)
+            window: Number of most recent records to keep in memory (None keeps all)
+            spill_path: Path prefix for the spill files of the ring buffer
+            spill_block: Records spilled at once (defaults to a quarter of the window)
+        """
+        if window is not None and window < 1:
+            raise ValueError("window must be at least 1.")
+        self.num_agents = num_agents
+        self.stride = stride
+        self.window = window
+        self.spill_path = spill_path
+        self.spill_block = min(window, spill_block or max(1, window // 4)) if window else None
+        rows = window if window is not None else capacity
+        self.steps = np.zeros(rows, dtype=np.int64)
+        self.knowledge = np.zeros((rows, num_agents), dtype=np.float32)
+        self.attitude = np.zeros((rows, num_agents), dtype=np.int8)
+        self.num_records = 0
+        self.num_spilled = 0
+
+        if spill_path is not None:
+            directory = os.path.dirname(spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            for name in self._spill_files().values():
+                open(name, 'wb').close()
+
+    def _spill_files(self):
+        return {
+            'steps': self.spill_path + '.steps.i64',
+            'knowledge': self.spill_path + '.knowledge.f32',
+            'attitude': self.spill_path + '.attitude.i8',
+        }
+
+    def reserve(self, num_steps):
+        """
+        Makes room for num_steps more steps of records without reallocation.
+        """
+        if self.window is not None:
+            return
+        needed = self.num_records + num_steps // self.stride + 1
+        if needed > len(self.steps):
+            self._resize(needed)
+
+    def _resize(self, rows):
+        self.steps = np.resize(self.steps, rows)
+        self.knowledge = np.resize(self.knowledge, (rows, self.num_agents))
+        self.attitude = np.resize(self.attitude, (rows, self.num_agents))
+
+    def record(self, step, population):
+        """
+        Records the population's state if step falls on the stride.
+        """
+        if step % self.stride != 0:
+            return
+        if self.window is None:
+            if self.num_records == len(self.steps):
+                self._resize(2 * len(self.steps))
+            row = self.num_records
+        else:
+            if self.num_records - self.num_spilled >= self.window:
+                self._spill()
+            row = self.num_records % self.window
+        self.steps[row] = step
+        self.knowledge[row] = population.knowledge
+        self.attitude[row] = population.ai_attitude
+        self.num_records += 1
+
+    def _spill(self):
+        """
+        Moves the oldest block of the ring buffer to the spill files.
+        """
+        records = np.arange(self.num_spilled, self.num_spilled + self.spill_block) % self.window
+        if self.spill_path is not None:
+            files = self._spill_files()
+            for name, array in (('steps', self.steps), ('knowledge', self.knowledge),
+                                ('attitude', self.attitude)):
+                with open(files[name], 'ab') as spill_file:
+                    array[records].tofile(spill_file)
+        self.num_spilled += self.spill_block
+
+    def recent(self):
+        """
+        Returns (steps, knowledge, attitude) of the records held in memory,
+        oldest first.
+        """
+        if self.window is None:
+            rows = slice(0, self.num_records)
+        else:
+            rows = np.arange(self.num_spilled, self.num_records) % self.window
+        return self.steps[rows], self.knowledge[rows], self.attitude[rows]
+
+    def spilled(self):
+        """
+        Returns (steps, knowledge, attitude) of the spilled records as
+        read-only memory maps, oldest first.
+        """
+        if self.spill_path is None or self.num_spilled == 0:
+            return (np.empty(0, dtype=np.int64),
+                    np.empty((0, self.num_agents), dtype=np.float32),
+                    np.empty((0, self.num_agents), dtype=np.int8))
+        files = self._spill_files()
+        shape = (self.num_spilled, self.num_agents)
+        return (np.memmap(files['steps'], dtype=np.int64, mode='r', shape=(self.num_spilled,)),
+                np.memmap(files['knowledge'], dtype=np.float32, mode='r', shape=shape),
+                np.memmap(files['attitude'], dtype=np.int8, mode='r', shape=shape))
+
+    def history(self):
+        """
+        Returns (steps, knowledge, attitude) of every available record, spilled
+        and in memory, as in-memory arrays.
+        """
+        return tuple(np.concatenate(parts) for parts in zip(self.spilled(), self.recent()))
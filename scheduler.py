@@ -0,0 +1,180 @@
+# scheduler.py
+
+import heapq
+import numpy as np
+
+# Event kinds, in the order they run when due at the same time
+AGENT_ACTION, AI_EVOLUTION, NETWORK_CHANGE, COLLECT = range(4)
+
+class EventScheduler:
+    """
+    Event-driven implementation of OrganizationModel.step (the 'event' engine).
+
+    Instead of every employee acting once per step in id order, each employee
+    acts at the events of a Poisson process with its own activity rate
+    (actions per step). A single heap holds the next action time of every
+    active employee together with the model's periodic events: GenerativeAI
+    evolution every step, social network changes every
+    network_change_frequency steps and data collection at the end of every
+    step. Processing an event costs O(log N), so the Python work scales with
+    the number of actions instead of with N x steps; idle employees are not
+    touched.
+
+    An action is what an agent does in one lock-step step: average knowledge
+    with a random social neighbor and a random org neighbor, take the AI
+    uplift and update the AI attitude. Knowledge decay is continuous
+    (knowledge_decay_rate per step) and applied lazily when an employee is
+    next involved in an action, and to everyone at once (vectorized) before
+    data is collected.
+    """
+    schedules_model_events = True
+
+    def __init__(self, model, activity_rates=None):
+        """
+        Parameters:
+            model: OrganizationModel whose population and networks are stepped
+            activity_rates: Actions per step, one number for everyone or one per
+                employee (None for 1.0, the average activity of the lock-step
+                engines); employees with rate 0 never act on their own
+        """
+        self.model = model
+        self.num_employees = model.num_employees
+        self.random = model.random
+        self.population = model.population
+        self.behavior_modifier = self.population.behavior_modifier.tolist()
+        self.rules = model.rules
+        rates = np.broadcast_to(np.asarray(1.0 if activity_rates is None else activity_rates,
+                                           dtype=np.float64), (self.num_employees,))
+        if (rates < 0).any():
+            raise ValueError("activity_rates must not be negative.")
+        self.rates = rates.tolist()
+
+        # Social neighbors are read from the live graph, so network changes cost nothing here
+        self.social_adjacency = model.social_network._adj
+        indptr, indices = model.org_chart.csr(self.num_employees)
+        self.org_indptr = indptr.tolist()
+        self.org_indices = indices.tolist()
+
+        # Time is measured in steps; the clock starts at the model's step
+        self.clock = float(model.current_step)
+        self.last_update = np.full(self.num_employees, self.clock)
+        active = np.flatnonzero(rates > 0)
+        first = self.clock + model.rng.exponential(1.0 / rates[active])
+        self.queue = [(time, AGENT_ACTION, agent) for time, agent in zip(first.tolist(), active.tolist())]
+        self.queue += [(self.clock + 1, AI_EVOLUTION, -1), (self.clock + 1, COLLECT, -1)]
+        if model.dynamic_network:
+            frequency = model.network_change_frequency
+            self.queue.append(((model.current_step // frequency + 1) * frequency, NETWORK_CHANGE, -1))
+        heapq.heapify(self.queue)
+
+    def network_changed(self):
+        """
+        Nothing to rebuild: actions look up social neighbors in the graph itself.
+        """
+
+    def step(self, timer=None):
+        """
+        Processes events in time order up to the next data collection, which
+        ends the step, charging each event to timer when given.
+        """
+        model = self.model
+        queue = self.queue
+        while True:
+            time, kind, agent = heapq.heappop(queue)
+            self.clock = time
+            if kind == AGENT_ACTION:
+                self.act(agent, time)
+                heapq.heappush(queue, (time + self.random.expovariate(self.rates[agent]),
+                                       AGENT_ACTION, agent))
+                if timer is not None:
+                    timer.lap('events')
+            elif kind == AI_EVOLUTION:
+                model.step_ai()
+                heapq.heappush(queue, (time + 1, AI_EVOLUTION, -1))
+                if timer is not None:
+                    timer.lap('ai_step')
+            elif kind == NETWORK_CHANGE:
+                model.modify_social_network()
+                heapq.heappush(queue, (time + model.network_change_frequency, NETWORK_CHANGE, -1))
+                if timer is not None:
+                    timer.lap('network')
+            else:
+                heapq.heappush(queue, (time + 1, COLLECT, -1))
+                self.settle_all(time)
+                if timer is not None:
+                    timer.lap('decay')
+                return
+
+    def settle(self, agent, time):
+        """
+        Applies the decay an employee accumulated since it was last updated.
+        """
+        elapsed = time - self.last_update[agent]
+        if elapsed > 0:
+            knowledge = self.population.knowledge
+            knowledge[agent] = max(0.0, knowledge[agent] - self.model.knowledge_decay_rate * elapsed)
+            self.last_update[agent] = time
+
+    def settle_all(self, time):
+        """
+        Brings every employee's decay up to time.
+        """
+        population = self.population
+        population.knowledge[:] = np.maximum(
+            population.knowledge - self.model.knowledge_decay_rate * (time - self.last_update), 0.0)
+        self.last_update[:] = time
+
+    def act(self, agent, time):
+        """
+        One action of agent: social and org interaction, AI uplift and
+        attitude update, by the model's rule kernels.
+        """
+        model = self.model
+        population = self.population
+        knowledge = population.knowledge
+        modifier = self.behavior_modifier
+        rules = self.rules
+        interaction = rules.interaction.function
+        self.settle(agent, time)
+        social_neighbors = list(self.social_adjacency[agent])
+        start = self.org_indptr[agent]
+        org_neighbors = self.org_indices[start:self.org_indptr[agent + 1]]
+        for neighbors in (social_neighbors, org_neighbors):
+            if neighbors:
+                partner = neighbors[int(self.random.random() * len(neighbors))]
+                if partner < self.num_employees:
+                    self.settle(partner, time)
+                    own, other = knowledge[agent], knowledge[partner]
+                    knowledge[agent] = interaction(own, other, modifier[agent])
+                    knowledge[partner] = interaction(other, own, modifier[partner])
+
+        ai_agent = model.ai_agent
+        attitude = population.ai_attitude[agent]
+        knowledge[agent] += rules.ai_uplift.function(attitude, ai_agent.knowledge_contribution)
+        ai_agent.usage_count += 1
+
+        population.ai_attitude[agent] = rules.attitude.function(
+            attitude, knowledge[agent] - population.expertise[agent],
+            model.attitude_positive_threshold, model.attitude_negative_threshold)
+
+    def get_state(self):
+        """
+        Scheduler state as arrays, for checkpoints.
+        """
+        times, kinds, agents = zip(*self.queue)
+        return {
+            "clock": np.array([self.clock]),
+            "last_update": self.last_update,
+            "queue_times": np.array(times, dtype=np.float64),
+            "queue_kinds": np.array(kinds, dtype=np.int64),
+            "queue_agents": np.array(agents, dtype=np.int64),
+        }
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state (the queue keeps its heap order).
+        """
+        self.clock = float(state["clock"][0])
+        self.last_update = np.array(state["last_update"], dtype=np.float64)
+        self.queue = list(zip(state["queue_times"].tolist(), state["queue_kinds"].tolist(),
+                              state["queue_agents"].tolist()))
@@ -0,0 +1,393 @@
+# sharedgraph.py
+
+import weakref
+from collections.abc import MutableMapping, Sequence
+from multiprocessing import shared_memory
+import numpy as np
+import networkx as nx
+from networks import adjacency_arrays, create_small_world_network, create_scale_free_network
+
+# Header of a published network: number of nodes, adjacency entries and edges
+HEADER_SIZE = 3
+
+def _layout(num_nodes, num_entries, num_edges):
+    """
+    Names and lengths of the int64 arrays in a published block, in order.
+    """
+    return [("header", HEADER_SIZE), ("indptr", num_nodes + 1), ("indices", num_entries),
+            ("edge_u", num_edges), ("edge_v", num_edges), ("edge_keys", num_edges),
+            ("edge_order", num_edges)]
+
+def _views(buffer, layout):
+    arrays, offset = {}, 0
+    for name, length in layout:
+        arrays[name] = np.ndarray(length, dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * length
+    return arrays
+
+def edge_keys(u, v, num_nodes):
+    """
+    Order-independent integer key of the undirected edges (u, v).
+    """
+    return np.minimum(u, v) * num_nodes + np.maximum(u, v)
+
+class SharedNetwork:
+    """
+    An undirected network published once as read-only arrays in a shared
+    memory block, for any number of processes to attach to with
+    SharedGraph.attach(name) without copying or unpickling it.
+
+    The block holds the adjacency in CSR form, with every node's neighbors in
+    the network's own iteration order (as networks.adjacency_arrays exports
+    them), and the edge list in G.edges() order with a sorted key index for
+    O(log E) edge lookups. Nodes must be 0..N-1. The publishing process owns
+    the block: close() (or collecting the object) removes it once the
+    attached models are done.
+    """
+    def __init__(self, G):
+        nodes, indptr, indices = adjacency_arrays(G)
+        num_nodes = len(nodes)
+        if not np.array_equal(nodes, np.arange(num_nodes)):
+            nodes = np.sort(nodes)
+            if not np.array_equal(nodes, np.arange(num_nodes)):
+                raise ValueError("Shared networks need nodes numbered 0..N-1.")
+            _, indptr, indices = adjacency_arrays(nx.convert_node_labels_to_integers(G, ordering='sorted'))
+        edges = np.array(list(G.edges()), dtype=np.int64).reshape(-1, 2)
+        layout = _layout(num_nodes, len(indices), len(edges))
+        size = 8 * sum(length for _, length in layout)
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self.memory.name
+        arrays = _views(self.memory.buf, layout)
+        arrays["header"][:] = (num_nodes, len(indices), len(edges))
+        arrays["indptr"][:] = indptr
+        arrays["indices"][:] = indices
+        arrays["edge_u"][:], arrays["edge_v"][:] = edges[:, 0], edges[:, 1]
+        keys = edge_keys(edges[:, 0], edges[:, 1], num_nodes)
+        order = np.argsort(keys, kind='stable')
+        arrays["edge_keys"][:] = keys[order]
+        arrays["edge_order"][:] = order
+        del arrays
+        self._finalizer = weakref.finalize(self, _unlink, self.memory)
+
+    def close(self):
+        """
+        Removes the block; processes already attached keep their mapping.
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _unlink(memory):
+    try:
+        memory.close()
+    except BufferError:
+        # Views of the block are still alive; the mapping goes with the process
+        pass
+    memory.unlink()
+
+def publish_social_network(num_employees=100, social_network_type='small_world', social_k=4, social_p=0.1,
+                           social_m=2, seed=None):
+    """
+    Builds the social network OrganizationModel would build for these
+    arguments (num_employees + 1 nodes, the last one for the AI) and
+    publishes it as a SharedNetwork.
+    """
+    total_agents = num_employees + 1
+    if social_network_type == 'small_world':
+        G = create_small_world_network(total_agents, social_k, social_p, seed=seed)
+    elif social_network_type == 'scale_free':
+        G = create_scale_free_network(total_agents, social_m, seed=seed)
+    else:
+        raise ValueError("Unsupported social network type.")
+    return SharedNetwork(G)
+
+class SharedRow(MutableMapping):
+    """
+    One node's neighbors {neighbor: edge data} read from the shared CSR
+    arrays. The first change copies the row into a private dict of the
+    adjacency, which answers for the node from then on.
+    """
+    __slots__ = ('adjacency', 'node')
+
+    def __init__(self, adjacency, node):
+        self.adjacency = adjacency
+        self.node = node
+
+    def _neighbors(self):
+        indptr = self.adjacency.indptr
+        return self.adjacency.indices[indptr[self.node]:indptr[self.node + 1]]
+
+    def __getitem__(self, neighbor):
+        row = self.adjacency.rows.get(self.node)
+        if row is not None:
+            return row[neighbor]
+        if neighbor in self:
+            return {}
+        raise KeyError(neighbor)
+
+    def __contains__(self, neighbor):
+        row = self.adjacency.rows.get(self.node)
+        if row is not None:
+            return neighbor in row
+        return isinstance(neighbor, (int, np.integer)) and bool((self._neighbors() == neighbor).any())
+
+    def __setitem__(self, neighbor, data):
+        self.adjacency.materialize(self.node)[neighbor] = data
+
+    def __delitem__(self, neighbor):
+        del self.adjacency.materialize(self.node)[neighbor]
+
+    def __iter__(self):
+        row = self.adjacency.rows.get(self.node)
+        return iter(row) if row is not None else iter(self._neighbors().tolist())
+
+    def __len__(self):
+        row = self.adjacency.rows.get(self.node)
+        if row is not None:
+            return len(row)
+        indptr = self.adjacency.indptr
+        return int(indptr[self.node + 1] - indptr[self.node])
+
+class SharedAdjacency(MutableMapping):
+    """
+    The outer adjacency dict of a SharedGraph: nodes map to SharedRow views
+    of the shared arrays until they are changed, then to private dicts
+    (rows). Only the rows touched by edge changes cost memory per graph.
+    """
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+        self.num_nodes = len(indptr) - 1
+        self.rows = {}
+        self.removed = set()
+
+    def _is_base(self, node):
+        return isinstance(node, (int, np.integer)) and 0 <= node < self.num_nodes and node not in self.removed
+
+    def materialize(self, node):
+        """
+        The node's private row, copied from the shared arrays on first use.
+        """
+        row = self.rows.get(node)
+        if row is None:
+            row = self.rows[node] = {neighbor: {} for neighbor in SharedRow(self, node)}
+        return row
+
+    def __getitem__(self, node):
+        row = self.rows.get(node)
+        if row is not None:
+            return row
+        if self._is_base(node):
+            return SharedRow(self, node)
+        raise KeyError(node)
+
+    def __contains__(self, node):
+        return node in self.rows or self._is_base(node)
+
+    def __setitem__(self, node, row):
+        self.rows[node] = row
+        self.removed.discard(node)
+
+    def __delitem__(self, node):
+        if node not in self:
+            raise KeyError(node)
+        self.rows.pop(node, None)
+        if self._is_base(node):
+            self.removed.add(node)
+
+    def __iter__(self):
+        for node in range(self.num_nodes):
+            if node not in self.removed:
+                yield node
+        for node in self.rows:
+            if not self._is_base(node):
+                yield node
+
+    def __len__(self):
+        extra = sum(1 for node in self.rows if not (isinstance(node, (int, np.integer)) and 0 <= node < self.num_nodes))
+        return self.num_nodes - len(self.removed) + extra
+
+class SharedNodes(MutableMapping):
+    """
+    The node attribute dict of a SharedGraph: every node of the adjacency,
+    with attribute dicts created on first access.
+    """
+    def __init__(self, adjacency):
+        self.adjacency = adjacency
+        self.attributes = {}
+
+    def __getitem__(self, node):
+        if node not in self.adjacency:
+            raise KeyError(node)
+        return self.attributes.setdefault(node, {})
+
+    def __contains__(self, node):
+        return node in self.adjacency
+
+    def __setitem__(self, node, attributes):
+        self.attributes[node] = attributes
+
+    def __delitem__(self, node):
+        if node not in self.adjacency:
+            raise KeyError(node)
+        self.attributes.pop(node, None)
+
+    def __iter__(self):
+        return iter(self.adjacency)
+
+    def __len__(self):
+        return len(self.adjacency)
+
+class SharedGraph(nx.Graph):
+    """
+    A networkx Graph attached to a SharedNetwork with zero copies and
+    copy-on-write edge changes.
+
+    Reads go straight to the shared arrays; adding or removing an edge
+    copies only the two affected neighbor rows into private dicts, so every
+    model can mutate its own graph while the topology is stored once per
+    machine. Everything in networkx that works on a Graph works on it.
+    Graphs built by copying or subgraphing are ordinary Graphs.
+    """
+    def __init__(self, incoming_graph_data=None, **attr):
+        super().__init__(incoming_graph_data, **attr)
+        self.shared = None
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches to the SharedNetwork published under name.
+        """
+        memory = shared_memory.SharedMemory(name=name)
+        num_nodes, num_entries, num_edges = np.ndarray(HEADER_SIZE, dtype=np.int64, buffer=memory.buf)
+        arrays = _views(memory.buf, _layout(int(num_nodes), int(num_entries), int(num_edges)))
+        for array in arrays.values():
+            array.flags.writeable = False
+        G = cls()
+        G.shared = arrays
+        # Keeps the mapping alive as long as the graph
+        G._memory = memory
+        G._adj = SharedAdjacency(arrays["indptr"], arrays["indices"])
+        G._node = SharedNodes(G._adj)
+        return G
+
+    def __reduce__(self):
+        # Copies, since the overlay is private to this process
+        return nx.Graph, (nx.to_dict_of_dicts(self),)
+
+    def edge_pool(self):
+        """
+        An EdgePool over this graph that keeps the shared edge list and only
+        stores the changes (see SharedEdgePool).
+        """
+        return SharedEdgePool(self)
+
+class SharedEdgeList(Sequence):
+    """
+    The edge list of a SharedEdgePool: position i holds the pool's change at
+    i if there is one, the shared edge i otherwise. Converts to an (E, 2)
+    array with np.array without going through Python tuples.
+    """
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __len__(self):
+        return self.pool.length
+
+    def __getitem__(self, position):
+        pool = self.pool
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(pool.length))]
+        if position < 0:
+            position += pool.length
+        if not 0 <= position < pool.length:
+            raise IndexError(position)
+        edge = pool.changes.get(position)
+        if edge is not None:
+            return edge
+        return int(pool.edge_u[position]), int(pool.edge_v[position])
+
+    def __iter__(self):
+        for position in range(self.pool.length):
+            yield self[position]
+
+    def __array__(self, dtype=None, copy=None):
+        pool = self.pool
+        num_base = min(pool.length, len(pool.edge_u))
+        edges = np.empty((pool.length, 2), dtype=np.int64)
+        edges[:num_base, 0] = pool.edge_u[:num_base]
+        edges[:num_base, 1] = pool.edge_v[:num_base]
+        if pool.changes:
+            positions = np.fromiter(pool.changes, dtype=np.int64, count=len(pool.changes))
+            edges[positions] = np.array(list(pool.changes.values()), dtype=np.int64).reshape(-1, 2)
+        return edges if dtype is None else edges.astype(dtype)
+
+class SharedEdgePool:
+    """
+    networks.EdgePool for a SharedGraph. The shared edge list is the initial
+    pool; removals (which move the last edge into the freed slot) and
+    additions are recorded in changes {position: edge}, and edges that moved
+    or were added in positions {edge: position}. Edges still in their shared
+    slot are found through the shared sorted key index, so the pool stores
+    O(changes) per model instead of one tuple and dict entry per edge.
+    edge_log works as in EdgePool.
+    """
+    def __init__(self, G):
+        self.G = G
+        shared = G.shared
+        self.edge_u, self.edge_v = shared["edge_u"], shared["edge_v"]
+        self.keys, self.order = shared["edge_keys"], shared["edge_order"]
+        self.nodes = range(G._adj.num_nodes)
+        self.length = len(self.edge_u)
+        self.changes = {}
+        self.positions = {}
+        self.edges = SharedEdgeList(self)
+        self.edge_log = None
+
+    def __len__(self):
+        return self.length
+
+    def _position(self, u, v):
+        for key in ((u, v), (v, u)):
+            position = self.positions.get(key)
+            if position is not None:
+                return key, position
+        key = edge_keys(u, v, len(self.nodes))
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            position = int(self.order[i])
+            if position < self.length and position not in self.changes:
+                return self.edges[position], position
+        raise KeyError((u, v))
+
+    def add_edge(self, u, v):
+        """
+        Adds the edge (u, v) to the network and the pool.
+        """
+        self.G.add_edge(u, v)
+        self.changes[self.length] = (u, v)
+        self.positions[(u, v)] = self.length
+        self.length += 1
+        if self.edge_log is not None:
+            self.edge_log.append((u, v))
+
+    def remove_edge(self, u, v):
+        """
+        Removes the edge (u, v) from the network and the pool by moving the
+        last pooled edge into its slot.
+        """
+        key, position = self._position(u, v)
+        last = self.edges[self.length - 1]
+        self.positions.pop(key, None)
+        self.changes.pop(self.length - 1, None)
+        self.length -= 1
+        if position < self.length:
+            self.changes[position] = last
+            self.positions[last] = position
+        self.G.remove_edge(u, v)
+        if self.edge_log is not None:
+            self.edge_log.append((u, v))
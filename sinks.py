@@ -0,0 +1,210 @@
+# sinks.py
+
+import csv
+import json
+import os
+import numpy as np
+
+class ResultSink:
+    """
+    Destination for simulation results that receives rows in batches while the
+    model runs. A batch is a dict mapping column names to equal-length lists,
+    the same layout as OrganizationModel.data.
+    """
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, columns):
+        raise NotImplementedError
+
+    def tell(self):
+        """
+        Position up to which everything written so far is on disk, to reopen
+        the file at (see open_sink), or None if the format can't be appended to.
+        """
+        return None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CSVSink(ResultSink):
+    """
+    Appends each batch to a CSV file and flushes it to disk. With an offset
+    the existing file is kept up to offset and its header gives the columns.
+    """
+    def __init__(self, path, offset=None):
+        super().__init__(path)
+        self.columns = None
+        if offset is None:
+            self.file = open(path, 'w', newline='')
+        else:
+            self.file = open(path, 'r+', newline='')
+            header = self.file.readline()
+            if header:
+                self.columns = next(csv.reader([header]))
+            self.file.seek(offset)
+            self.file.truncate()
+        self.writer = csv.writer(self.file)
+
+    def write(self, columns):
+        if self.columns is None:
+            self.columns = list(columns)
+            self.writer.writerow(self.columns)
+        self.writer.writerows(zip(*(columns[name] for name in self.columns)))
+        self.file.flush()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowSink(ResultSink):
+    """
+    Writes each batch as a record batch of a Parquet or Feather (Arrow IPC)
+    file. Requires pyarrow.
+    """
+    def __init__(self, path, file_format='parquet'):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet and Feather output.")
+        if file_format not in ('parquet', 'feather'):
+            raise ValueError("Unsupported Arrow file format.")
+        super().__init__(path)
+        self.pyarrow = pyarrow
+        self.file_format = file_format
+        self.writer = None
+
+    def write(self, columns):
+        table = self.pyarrow.table(columns)
+        if self.writer is None:
+            if self.file_format == 'parquet':
+                import pyarrow.parquet
+                self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            else:
+                self.writer = self.pyarrow.ipc.new_file(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class BinarySink(ResultSink):
+    """
+    Appends rows as little-endian float64 records to a raw binary file that
+    read_results memory-maps with NumPy. Column names and which columns hold
+    integers are kept in a JSON sidecar (path + '.json'). A crash can at most
+    leave a partial last row, which readers ignore. With an offset the
+    existing file is kept up to offset and the sidecar gives the columns.
+    """
+    def __init__(self, path, offset=None):
+        super().__init__(path)
+        self.columns = None
+        if offset is None:
+            self.file = open(path, 'wb')
+        else:
+            if os.path.exists(path + '.json'):
+                with open(path + '.json') as header:
+                    self.columns = json.load(header)["columns"]
+            self.file = open(path, 'r+b')
+            self.file.seek(offset)
+            self.file.truncate()
+
+    def write(self, columns):
+        if self.columns is None:
+            self.columns = list(columns)
+            integer = [all(isinstance(value, (int, np.integer)) for value in columns[name])
+                       for name in self.columns]
+            with open(self.path + '.json', 'w') as header:
+                json.dump({"columns": self.columns, "integer": integer}, header)
+        rows = np.column_stack([np.asarray(columns[name], dtype='<f8') for name in self.columns])
+        rows.tofile(self.file)
+        self.file.flush()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+SINK_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+    '.bin': 'binary',
+}
+
+def result_format(path, file_format=None):
+    """
+    Returns the result format for path: file_format if given, else inferred
+    from the file extension.
+    """
+    if file_format is None:
+        file_format = SINK_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in ('csv', 'parquet', 'feather', 'binary'):
+        raise ValueError("Unsupported result format.")
+    return file_format
+
+def open_sink(path, file_format=None, offset=None):
+    """
+    Opens a result sink for path ('csv', 'parquet', 'feather' or 'binary';
+    inferred from the extension when file_format is None). With an offset (a
+    position returned by the sink's tell()) the existing file is truncated to
+    it and appended to instead of overwritten; only CSV and binary files can
+    be reopened this way.
+    """
+    file_format = result_format(path, file_format)
+    if file_format == 'csv':
+        return CSVSink(path, offset)
+    if file_format == 'binary':
+        return BinarySink(path, offset)
+    if offset is not None:
+        raise ValueError(f"{file_format} results can't be appended to; use a new output path.")
+    return ArrowSink(path, file_format)
+
+def read_binary_results(path):
+    """
+    Memory-maps a BinarySink file. Returns (columns, integer flags, rows) where
+    rows is a read-only float64 array of shape (num_rows, num_columns).
+    """
+    with open(path + '.json') as header:
+        meta = json.load(header)
+    num_columns = len(meta["columns"])
+    num_rows = os.path.getsize(path) // (8 * num_columns)
+    if num_rows == 0:
+        rows = np.empty((0, num_columns), dtype='<f8')
+    else:
+        rows = np.memmap(path, dtype='<f8', mode='r', shape=(num_rows, num_columns))
+    return meta["columns"], meta["integer"], rows
+
+def read_results(path, file_format=None):
+    """
+    Reads results written by any sink into a pandas DataFrame.
+    """
+    import pandas as pd
+
+    file_format = result_format(path, file_format)
+    if file_format == 'csv':
+        return pd.read_csv(path)
+    if file_format == 'parquet':
+        return pd.read_parquet(path)
+    if file_format == 'feather':
+        return pd.read_feather(path)
+    columns, integer, rows = read_binary_results(path)
+    return pd.DataFrame({name: rows[:, i].astype(np.int64) if is_integer else np.array(rows[:, i])
+                         for i, (name, is_integer) in enumerate(zip(columns, integer))})
@@ -0,0 +1,128 @@
+# stopping.py
+
+import time
+from collections import deque
+import numpy as np
+from agents import AI_ATTITUDES
+
+class StoppingCriterion:
+    """
+    Base class of the criteria that end OrganizationModel.run_model early.
+
+    run_model calls reset(model) before the first step and check(model)
+    after every step; check returns a short reason string to stop the run,
+    or None to continue. Criteria only look at the latest collected metrics,
+    so they work with keep_data=False.
+    """
+    def reset(self, model):
+        pass
+
+    def check(self, model):
+        raise NotImplementedError
+
+class RelativeChange(StoppingCriterion):
+    """
+    Stops once every watched column of model.data has settled: over the last
+    window steps its range (max - min) is at most tolerance times its mean
+    magnitude.
+    """
+    COLUMNS = ("Average Knowledge", "Positive Attitudes", "Neutral Attitudes",
+               "Negative Attitudes", "AI Knowledge Contribution")
+
+    def __init__(self, window=50, tolerance=1e-3, columns=COLUMNS, min_steps=0):
+        """
+        Parameters:
+            window: Number of consecutive steps that must stay within tolerance
+            tolerance: Largest relative range still counted as settled
+            columns: Columns of model.data to watch
+            min_steps: Steps before the criterion may stop the run
+        """
+        self.window = window
+        self.tolerance = tolerance
+        self.columns = tuple(columns)
+        self.min_steps = min_steps
+
+    def reset(self, model):
+        self.history = deque(maxlen=self.window)
+        self.steps = 0
+
+    def check(self, model):
+        self.history.append([model.data[column][-1] for column in self.columns])
+        self.steps += 1
+        if self.steps < max(self.window, self.min_steps):
+            return None
+        values = np.array(self.history)
+        spread = values.max(axis=0) - values.min(axis=0)
+        scale = np.maximum(np.abs(values.mean(axis=0)), np.finfo(float).tiny)
+        if np.all(spread <= self.tolerance * scale):
+            return f"relative change below {self.tolerance:g} for {self.window} steps"
+        return None
+
+class AbsorbingAttitude(StoppingCriterion):
+    """
+    Stops once every employee has held the same AI attitude (or the given
+    one) for patience consecutive steps.
+    """
+    def __init__(self, attitude=None, patience=1):
+        """
+        Parameters:
+            attitude: 'negative', 'neutral' or 'positive' (None accepts any)
+            patience: Consecutive steps the state must hold
+        """
+        if attitude is not None and attitude not in AI_ATTITUDES:
+            raise ValueError("Unsupported attitude.")
+        self.attitude = attitude
+        self.patience = patience
+
+    def reset(self, model):
+        self.streak = 0
+
+    def check(self, model):
+        counts = model.metrics.attitude_counts
+        if self.attitude is None:
+            absorbed = max(counts) == model.num_employees
+        else:
+            absorbed = counts[AI_ATTITUDES.index(self.attitude)] == model.num_employees
+        self.streak = self.streak + 1 if absorbed else 0
+        if self.streak >= self.patience:
+            attitude = self.attitude or AI_ATTITUDES[counts.index(max(counts))]
+            return f"all employees {attitude} for {self.patience} steps"
+        return None
+
+class StepBudget(StoppingCriterion):
+    """
+    Stops once the model has reached max_steps steps in total (counting
+    steps before a resume, unlike run_model's n_steps).
+    """
+    def __init__(self, max_steps):
+        self.max_steps = max_steps
+
+    def check(self, model):
+        if model.current_step >= self.max_steps:
+            return f"step budget of {self.max_steps} reached"
+        return None
+
+class WallClockBudget(StoppingCriterion):
+    """
+    Stops once the run has taken seconds of wall time.
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def reset(self, model):
+        self.deadline = time.monotonic() + self.seconds
+
+    def check(self, model):
+        if time.monotonic() >= self.deadline:
+            return f"wall-clock budget of {self.seconds:g} s reached"
+        return None
+
+def as_criteria(stop_when):
+    """
+    Normalizes run_model's stop_when (None, a criterion or a list of them) to a list.
+    """
+    if stop_when is None:
+        return []
+    if isinstance(stop_when, StoppingCriterion):
+        return [stop_when]
+    return list(stop_when)
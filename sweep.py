@@ -0,0 +1,167 @@
+# sweep.py
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from model import OrganizationModel
+from sharedgraph import publish_social_network
+from stopping import RelativeChange, WallClockBudget
+
+# Arguments every run gets from the sweep itself, so grids and base params can't set them
+RESERVED_PARAMS = ('seed', 'social_graph')
+
+def expand_grid(grid):
+    """
+    Expands a parameter grid {name: [values, ...]} into the list of all
+    parameter combinations (cartesian product, in the order given).
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+def run_seed(base_seed, combination, replicate):
+    """
+    Deterministic seed for one run, derived from the base seed and the run's
+    (combination, replicate) position so it doesn't change when replicates
+    or grid values are appended.
+    """
+    seed_seq = np.random.SeedSequence(base_seed, spawn_key=(combination, replicate))
+    return int(seed_seq.generate_state(1)[0])
+
+def run_replicate(params, replicate, seed, n_steps, stop_when=None, social_graph=None):
+    """
+    Runs one replicate of OrganizationModel with the given __init__ kwargs and
+    returns its collected data as columns keyed by parameters and replicate,
+    with the reason it stopped early (None if it ran n_steps). Workers only
+    return plain lists, so they never import pandas. social_graph is the name
+    of a shared social network to attach to (see sharedgraph.py).
+    """
+    kwargs = {'quiet': True, **params, 'seed': seed}
+    if social_graph is not None:
+        kwargs['social_graph'] = social_graph
+    model = OrganizationModel(**kwargs)
+    model.run_model(n_steps, output_path=None, stop_when=stop_when)
+
+    num_rows = len(model.data["Step"])
+    keys = dict(params, replicate=replicate, seed=seed, stop_reason=model.stop_reason)
+    columns = {name: [value] * num_rows for name, value in keys.items()}
+    columns.update(model.data)
+    return columns
+
+def social_network_key(params):
+    """
+    The OrganizationModel arguments that determine the social network.
+    """
+    defaults = dict(num_employees=100, social_network_type='small_world', social_k=4, social_p=0.1,
+                    social_m=2)
+    return tuple((name, params.get(name, default)) for name, default in defaults.items())
+
+def run_sweep(grid, replicates=1, n_steps=100, base_seed=0, base_params=None, max_workers=None,
+              stop_when=None, share_network=False):
+    """
+    Runs every parameter combination of the grid replicates times on a process
+    pool and returns all results in one tidy DataFrame. Every run is its own
+    task, so a worker whose run stops early moves straight on to the next
+    queued replicate.
+
+    Parameters:
+        grid: Dict mapping OrganizationModel.__init__ kwargs to lists of values
+        replicates: Number of replicates per parameter combination
+        n_steps: Steps per run
+        base_seed: Seed from which every run's seed is derived
+        base_params: Kwargs shared by all runs (overridden by the grid)
+        max_workers: Number of worker processes (defaults to all cores)
+        stop_when: Stopping criteria for every run (see stopping.py); each run
+            gets its own copy
+        share_network: Build each distinct social network once (seeded from
+            base_seed) and have all runs with those network arguments attach
+            to it in shared memory instead of building their own; runs then
+            differ only in everything but the initial social topology
+    """
+    import pandas as pd
+
+    reserved = [name for name in RESERVED_PARAMS if name in grid or name in (base_params or {})]
+    if reserved:
+        raise ValueError(f"{', '.join(reserved)} cannot be swept or set in base_params; every run's seed "
+                         "is derived from base_seed and shared networks are set with share_network.")
+    combinations = [dict(base_params or {}, **params) for params in expand_grid(grid)]
+    networks = {}
+    if share_network:
+        for params in combinations:
+            key = social_network_key(params)
+            if key not in networks:
+                networks[key] = publish_social_network(**dict(key), seed=base_seed)
+    results = {}
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for c, params in enumerate(combinations):
+                network = networks.get(social_network_key(params))
+                social_graph = network.name if network is not None else None
+                for replicate in range(replicates):
+                    seed = run_seed(base_seed, c, replicate)
+                    future = executor.submit(run_replicate, params, replicate, seed, n_steps,
+                                             stop_when, social_graph)
+                    futures[future] = (c, replicate)
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        for network in networks.values():
+            network.close()
+
+    if not results:
+        return pd.DataFrame()
+    return pd.concat([pd.DataFrame(results[key]) for key in sorted(results)], ignore_index=True)
+
+def parse_value(text):
+    """
+    Converts a command-line value to bool, int or float where possible.
+    """
+    if text in ('True', 'False'):
+        return text == 'True'
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of OrganizationModel.")
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help="Grid values for an OrganizationModel argument (repeatable)")
+    parser.add_argument('--replicates', type=int, default=1, help="Replicates per combination")
+    parser.add_argument('--steps', type=int, default=100, help="Steps per run")
+    parser.add_argument('--seed', type=int, default=0, help="Base seed")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--stop-tolerance', type=float, default=None,
+                        help="Stop runs whose metrics change less than this (relative) over --stop-window steps")
+    parser.add_argument('--stop-window', type=int, default=50, help="Window for --stop-tolerance")
+    parser.add_argument('--max-seconds', type=float, default=None, help="Wall-clock budget per run")
+    parser.add_argument('--share-network', action='store_true',
+                        help="Build each social network once and share it with all runs")
+    parser.add_argument('--output', default='data/sweep_results.csv', help="Output CSV path")
+    args = parser.parse_args()
+
+    grid = {}
+    for spec in args.param:
+        name, _, values = spec.partition('=')
+        grid[name] = [parse_value(value) for value in values.split(',')]
+
+    stop_when = []
+    if args.stop_tolerance is not None:
+        stop_when.append(RelativeChange(args.stop_window, args.stop_tolerance))
+    if args.max_seconds is not None:
+        stop_when.append(WallClockBudget(args.max_seconds))
+
+    results = run_sweep(grid, args.replicates, args.steps, args.seed, max_workers=args.workers,
+                        stop_when=stop_when, share_network=args.share_network)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"Sweep completed: {len(results)} rows saved to '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
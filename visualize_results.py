@@ -1,87 +1,54 @@
 # visualize_results.py
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import os
+import argparse
+import logging
 
-def plot_metrics(data_path='data/results.csv'):
+logger = logging.getLogger(__name__)
+
+def plot_metrics(data_path='data/results.csv', output_dir='data'):
     """
-    Plots various metrics from the simulation data.
+    Plots various metrics from the simulation data (see plotting.plot_metrics;
+    matplotlib is only imported when plotting).
     """
-    if not os.path.exists(data_path):
-        print(f"Data file '{data_path}' not found.")
-        return
-
-    data = pd.read_csv(data_path)
-
-    # Plot Average Knowledge Over Time
-    plt.figure(figsize=(12, 6))
-    plt.plot(data["Step"], data["Average Knowledge"], label="Average Knowledge", color='blue')
-    plt.xlabel("Time Steps")
-    plt.ylabel("Average Knowledge")
-    plt.title("Average Knowledge Over Time")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig('data/average_knowledge_over_time.png')
-    plt.show()
-
-    # Plot AI Utilization Over Time
-    plt.figure(figsize=(12, 6))
-    plt.plot(data["Step"], data["Positive Attitudes"], label="Positive Attitudes", color='green')
-    plt.plot(data["Step"], data["Neutral Attitudes"], label="Neutral Attitudes", color='orange')
-    plt.plot(data["Step"], data["Negative Attitudes"], label="Negative Attitudes", color='red')
-    plt.xlabel("Time Steps")
-    plt.ylabel("Number of Agents")
-    plt.title("AI Utilization Over Time")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig('data/ai_utilization_over_time.png')
-    plt.show()
-
-    # Plot AI Knowledge Contribution Over Time
-    plt.figure(figsize=(12, 6))
-    plt.plot(data["Step"], data["AI Knowledge Contribution"], label="AI Knowledge Contribution", color='purple')
-    plt.xlabel("Time Steps")
-    plt.ylabel("AI Knowledge Contribution")
-    plt.title("AI Knowledge Contribution Over Time")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig('data/ai_contribution_over_time.png')
-    plt.show()
+    from plotting import plot_metrics
+    plot_metrics(data_path, output_dir)
 
-    # Plot Network Centrality Over Time
-    plt.figure(figsize=(12, 6))
-    plt.plot(data["Step"], data["Network Centrality"], label="Average Network Centrality", color='brown')
-    plt.xlabel("Time Steps")
-    plt.ylabel("Average Degree Centrality")
-    plt.title("Average Network Centrality Over Time")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig('data/network_centrality_over_time.png')
-    plt.show()
-
-    # Advanced Analysis: Correlation between AI Knowledge Contribution and Average Knowledge
-    plt.figure(figsize=(12, 6))
-    plt.scatter(data["AI Knowledge Contribution"], data["Average Knowledge"], color='teal')
-    plt.xlabel("AI Knowledge Contribution")
-    plt.ylabel("Average Knowledge")
-    plt.title("Correlation between AI Contribution and Average Knowledge")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig('data/correlation_ai_knowledge_average_knowledge.png')
-    plt.show()
-
-    correlation = data["AI Knowledge Contribution"].corr(data["Average Knowledge"])
-    print(f"Correlation between AI Knowledge Contribution and Average Knowledge: {correlation:.2f}")
-
-    # Additional Plots can be added as needed
+def plot_ensemble(paths, output_dir='data', run_key=None, cache_path=None, confidence=0.95):
+    """
+    Aggregates many result files (one run each, or split by run_key) into
+    per-step means, confidence bands and correlation summaries, and renders
+    all panels to PNG files without opening windows. With cache_path the
+    aggregate is reused as long as the files are unchanged, so re-plotting
+    doesn't re-read the runs. Returns the summary (see analysis.RunAggregator).
+    """
+    from analysis import aggregate_runs
+    from plotting import plot_aggregate
+
+    summary = aggregate_runs(paths, run_key=run_key, cache_path=cache_path).summary(confidence)
+    plot_aggregate(summary, output_dir)
+    columns = summary["columns"]
+    row = columns.index("AI Knowledge Contribution")
+    column = columns.index("Average Knowledge")
+    logger.info("Correlation between AI Knowledge Contribution and Average Knowledge over %d runs: "
+                "%.2f (%.0f%% CI %.2f to %.2f)", summary["num_runs"], summary["corr_mean"][row, column],
+                confidence * 100, summary["corr_low"][row, column], summary["corr_high"][row, column])
+    return summary
 
 def main():
-    plot_metrics()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Plot the results of one or many simulation runs.")
+    parser.add_argument('paths', nargs='*', default=['data/results.csv'], help="Result files")
+    parser.add_argument('--output-dir', default='data', help="Directory for the PNG files")
+    parser.add_argument('--run-key', help="Column that separates runs within a file (e.g. seed)")
+    parser.add_argument('--cache', help="File for the cached aggregate (.npz)")
+    parser.add_argument('--confidence', type=float, default=0.95, help="Confidence level of the bands")
+    parser.add_argument('--ensemble', action='store_true',
+                        help="Plot ensemble bands even for a single file (implied by several files or --run-key)")
+    args = parser.parse_args()
+    if args.ensemble or args.run_key or len(args.paths) > 1:
+        plot_ensemble(args.paths, args.output_dir, args.run_key, args.cache, args.confidence)
+    else:
+        plot_metrics(args.paths[0], args.output_dir)
 
 if __name__ == "__main__":
     main()